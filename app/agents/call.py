@@ -1,34 +1,42 @@
+import asyncio
 import logging
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
 from twilio.twiml.voice_response import VoiceResponse
-from config.comm_config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, get_store_contact
+from config.comm_config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, CHANNEL_TIMEOUTS, get_store_contact
 from config.logging_config import get_logger
+from metrics import record_external_call
 
 logger = get_logger(__name__)
 
-def call_execution_node(state):
+async def call_execution_node(state):
     """Make voice call using Twilio API."""
     incident_id = state.get("incident_id", "unknown")
     
     if not state.get("execution_actions") or not state["execution_actions"].get("call"):
         logger.debug(f"[INCIDENT-{incident_id}] [CALL] No call action in execution_actions, skipping")
-        return state
+        return {}
     
     c = state["execution_actions"]["call"]
     if not c.get("enabled", False):
         logger.debug(f"[INCIDENT-{incident_id}] [CALL] Call action disabled, skipping")
-        return state
+        return {}
 
     logger.info(f"[INCIDENT-{incident_id}] [CALL] Starting call execution")
 
     if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
         logger.error(f"[INCIDENT-{incident_id}] [CALL] Twilio credentials not configured")
-        state["episode_memory"].append("CALL ERROR: Twilio credentials not configured")
-        state["execution_results"]["call"] = {"status": "failed", "error": "Credentials missing"}
-        return state
+        return {
+            "episode_memory": ["CALL ERROR: Twilio credentials not configured"],
+            "execution_results": {"call": {"status": "failed", "error": "Credentials missing"}},
+        }
 
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        # HTTP timeout within the dispatch deadline, so the request ends with it
+        client = Client(
+            TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+            http_client=TwilioHttpClient(timeout=CHANNEL_TIMEOUTS["call"]),
+        )
         
         store_id = state.get("store_id", "default")
         to_phone = c.get("to") or get_store_contact(store_id, "phone")
@@ -48,7 +56,9 @@ def call_execution_node(state):
         twiml_response.say(script, voice='alice', language='en-US')
         
         # Make the call
-        call = client.calls.create(
+        record_external_call("twilio")
+        call = await asyncio.to_thread(
+            client.calls.create,
             to=to_phone,
             from_=TWILIO_PHONE_NUMBER,
             twiml=twiml_response.to_xml()
@@ -56,18 +66,20 @@ def call_execution_node(state):
         
         logger.info(f"[INCIDENT-{incident_id}] [CALL] Call initiated successfully - SID: {call.sid}")
         
-        state["execution_results"]["call"] = {
-            "status": "initiated",
-            "call_sid": call.sid,
-            "to": to_phone,
-            "from": TWILIO_PHONE_NUMBER,
-            "subject": subject if subject else None
+        return {
+            "execution_results": {"call": {
+                "status": "initiated",
+                "call_sid": call.sid,
+                "to": to_phone,
+                "from": TWILIO_PHONE_NUMBER,
+                "subject": subject if subject else None
+            }},
+            "episode_memory": [f"Call initiated to {to_phone} (SID: {call.sid})"],
         }
-        state["episode_memory"].append(f"Call initiated to {to_phone} (SID: {call.sid})")
         
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [CALL] Call failed: {str(e)}", exc_info=True)
-        state["episode_memory"].append(f"CALL ERROR: {str(e)}")
-        state["execution_results"]["call"] = {"status": "failed", "error": str(e)}
-    
-    return state
\ No newline at end of file
+        return {
+            "episode_memory": [f"CALL ERROR: {str(e)}"],
+            "execution_results": {"call": {"status": "failed", "error": str(e)}},
+        }
\ No newline at end of file
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from agents.voice import voice_execution_node
+from agents.email import email_execution_node
+from agents.call import call_execution_node
+from config.comm_config import CHANNEL_TIMEOUTS
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# execution_actions key -> (channel name, channel node)
+CHANNELS = {
+    "announce": ("voice", voice_execution_node),
+    "email": ("email", email_execution_node),
+    "call": ("call", call_execution_node),
+}
+
+async def _run_channel(state, channel, node):
+    incident_id = state.get("incident_id", "unknown")
+    timeout = CHANNEL_TIMEOUTS[channel]
+    try:
+        return await asyncio.wait_for(node(state), timeout=timeout)
+    except asyncio.TimeoutError:
+        # The send runs in a worker thread that wait_for cannot stop, so it may
+        # still go out: the outcome is unknown, not failed
+        logger.error(f"[INCIDENT-{incident_id}] [DISPATCH] {channel} channel exceeded {timeout}s deadline, outcome unknown")
+        return {
+            "execution_results": {channel: {"status": "unknown", "timeout_seconds": timeout}},
+            "episode_memory": [f"{channel.upper()} UNKNOWN: no response within {timeout}s, the message may still be delivered"],
+        }
+    except Exception as e:
+        logger.error(f"[INCIDENT-{incident_id}] [DISPATCH] {channel} channel failed: {str(e)}", exc_info=True)
+        return {
+            "execution_results": {channel: {"status": "failed", "error": str(e)}},
+            "episode_memory": [f"{channel.upper()} ERROR: {str(e)}"],
+        }
+
+async def dispatch_node(state):
+    """Send every enabled action concurrently, each bounded by its channel deadline."""
+    incident_id = state.get("incident_id", "unknown")
+    actions = state.get("execution_actions") or {}
+
+    enabled = [
+        (channel, node)
+        for action_key, (channel, node) in CHANNELS.items()
+        if (actions.get(action_key) or {}).get("enabled", False)
+    ]
+    if not enabled:
+        logger.info(f"[INCIDENT-{incident_id}] [DISPATCH] No enabled communication actions")
+        return {}
+
+    logger.info(f"[INCIDENT-{incident_id}] [DISPATCH] Dispatching channels concurrently: {[c for c, _ in enabled]}")
+    outcomes = await asyncio.gather(*(_run_channel(state, channel, node) for channel, node in enabled))
+
+    execution_results = {}
+    episode_memory = []
+    for outcome in outcomes:
+        execution_results.update(outcome.get("execution_results", {}))
+        episode_memory.extend(outcome.get("episode_memory", []))
+
+    statuses = {channel: result.get("status") for channel, result in execution_results.items()}
+    logger.info(f"[INCIDENT-{incident_id}] [DISPATCH] Dispatch completed - Results: {statuses}")
+    return {"execution_results": execution_results, "episode_memory": episode_memory}
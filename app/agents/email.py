@@ -1,32 +1,35 @@
 import os
+import asyncio
 import logging
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
-from config.comm_config import SENDGRID_API_KEY, SENDGRID_FROM_EMAIL, get_store_contact
+from config.comm_config import SENDGRID_API_KEY, SENDGRID_FROM_EMAIL, CHANNEL_TIMEOUTS, get_store_contact
 from config.logging_config import get_logger
+from metrics import record_external_call
 
 logger = get_logger(__name__)
 
-def email_execution_node(state):
+async def email_execution_node(state):
     """Send email using Twilio SendGrid API."""
     incident_id = state.get("incident_id", "unknown")
     
     if not state.get("execution_actions") or not state["execution_actions"].get("email"):
         logger.debug(f"[INCIDENT-{incident_id}] [EMAIL] No email action in execution_actions, skipping")
-        return state
+        return {}
     
     e = state["execution_actions"]["email"]
     if not e.get("enabled", False):
         logger.debug(f"[INCIDENT-{incident_id}] [EMAIL] Email action disabled, skipping")
-        return state
+        return {}
 
     logger.info(f"[INCIDENT-{incident_id}] [EMAIL] Starting email execution")
 
     if not SENDGRID_API_KEY:
         logger.error(f"[INCIDENT-{incident_id}] [EMAIL] SendGrid API key not configured")
-        state["episode_memory"].append("EMAIL ERROR: SendGrid API key not configured")
-        state["execution_results"]["email"] = {"status": "failed", "error": "API key missing"}
-        return state
+        return {
+            "episode_memory": ["EMAIL ERROR: SendGrid API key not configured"],
+            "execution_results": {"email": {"status": "failed", "error": "API key missing"}},
+        }
 
     try:
         store_id = state.get("store_id", "default")
@@ -46,21 +49,26 @@ def email_execution_node(state):
         )
 
         sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
+        # HTTP timeout within the dispatch deadline, so the request ends with it
+        sg.client.timeout = CHANNEL_TIMEOUTS["email"]
+        record_external_call("sendgrid")
+        response = await asyncio.to_thread(sg.send, message)
         
         logger.info(f"[INCIDENT-{incident_id}] [EMAIL] Email sent successfully - Status: {response.status_code}")
         
-        state["execution_results"]["email"] = {
-            "status": "sent",
-            "status_code": response.status_code,
-            "to": to_email,
-            "subject": subject
+        return {
+            "execution_results": {"email": {
+                "status": "sent",
+                "status_code": response.status_code,
+                "to": to_email,
+                "subject": subject
+            }},
+            "episode_memory": [f"Email sent to {to_email}"],
         }
-        state["episode_memory"].append(f"Email sent to {to_email}")
         
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [EMAIL] Email sending failed: {str(e)}", exc_info=True)
-        state["episode_memory"].append(f"EMAIL ERROR: {str(e)}")
-        state["execution_results"]["email"] = {"status": "failed", "error": str(e)}
-    
-    return state
\ No newline at end of file
+        return {
+            "episode_memory": [f"EMAIL ERROR: {str(e)}"],
+            "execution_results": {"email": {"status": "failed", "error": str(e)}},
+        }
\ No newline at end of file
@@ -1,34 +1,24 @@
 import logging
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
+from agents.rag_queries import explain_query, prefetch, POST_MONITOR_QUERIES
 
 logger = get_logger(__name__)
 
-def explainability_node(state):
+async def explainability_node(state, config: RunnableConfig):
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [EXPLAINABILITY] Starting explainability node")
 
-    rag = state["rag_engine"]
+    rag = config["configurable"]["rag_engine"]
     severity = state.get("severity", 0)
     incident_type = state.get("incident_type", "unknown")
     confidence = state.get("confidence", 0.0)
 
-    # High-quality, targeted RAG query
-    rag_query = f"""
-Retail safety and security policy justification.
-
-Incident type: {incident_type}
-Severity level: {severity}
-
-Retrieve:
-- Relevant policy clauses
-- Risk classification rules
-- Escalation criteria
-- Any similar precedent incidents
-"""
-
     logger.debug(f"[INCIDENT-{incident_id}] [EXPLAINABILITY] RAG query prepared")
 
-    refs = rag.query(rag_query)
+    # Severity is final after monitor: fetch the explain and self-reflection lookups together
+    await prefetch(rag, state, POST_MONITOR_QUERIES)
+    refs = await rag.aquery(**explain_query(state))
     policy_context = refs.get("context", "")
 
     logger.debug(
@@ -36,7 +26,7 @@ Retrieve:
     )
 
     # Structured, human-readable explanation
-    state["explanation"] = f"""
+    explanation = f"""
 INCIDENT EXPLANATION REPORT
 ---------------------------
 
@@ -70,4 +60,4 @@ and human review if required.
         f"[INCIDENT-{incident_id}] [EXPLAINABILITY] Explanation generated successfully"
     )
 
-    return state
+    return {"explanation": explanation}
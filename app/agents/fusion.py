@@ -1,15 +1,16 @@
 import json
 import logging
 from state import IncidentState
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
-def fusion_understanding_node(state: IncidentState) -> IncidentState:
+async def fusion_understanding_node(state: IncidentState, config: RunnableConfig) -> dict:
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [FUSION] Starting fusion node")
     
-    llm = state["llm"]
+    llm = config["configurable"]["llm"]
     vision_signal = state.get("vision_signal")
     audio_signal = state.get("audio_signal")
     video_signal = state.get("video_signal")
@@ -32,14 +33,13 @@ VIDEO SIGNAL: {video_signal}
 """
     try:
         logger.debug(f"[INCIDENT-{incident_id}] [FUSION] Invoking LLM for fusion...")
-        resp = llm.invoke(prompt)
+        resp = await llm.ainvoke(prompt)
         print(resp)
-        state["fused_incident"] = json.loads(resp if isinstance(resp, str) else resp.content)
-        incident_type = state["fused_incident"].get("incident_type", "unknown")
-        confidence = state["fused_incident"].get("combined_confidence", 0.0)
+        fused_incident = json.loads(resp if isinstance(resp, str) else resp.content)
+        incident_type = fused_incident.get("incident_type", "unknown")
+        confidence = fused_incident.get("combined_confidence", 0.0)
         logger.info(f"[INCIDENT-{incident_id}] [FUSION] Fusion completed - Type: {incident_type}, Confidence: {confidence}")
+        return {"fused_incident": fused_incident}
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [FUSION] Fusion failed: {str(e)}", exc_info=True)
-        state["fused_incident"] = {}
-        state["episode_memory"].append(f"FUSION JSON ERROR: {str(e)}")
-    return state
+        return {"fused_incident": {}, "episode_memory": [f"FUSION JSON ERROR: {str(e)}"]}
@@ -1,14 +1,18 @@
+import time
 import logging
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
+from agents.rag_queries import fused_incident_type
 
 logger = get_logger(__name__)
 
-def learning_node(state):
+async def learning_node(state, config: RunnableConfig):
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [LEARNING] Starting learning node")
     
-    rag = state["rag_engine"]
-    incident_type = state.get("incident_type", "unknown")
+    rag = config["configurable"]["rag_engine"]
+    # Stored under the type the memory lookups filter on
+    incident_type = fused_incident_type(state) or "unknown"
     severity = state.get("severity", 0)
     resolved = state.get("resolved", False)
     store_id = state.get("store_id", "unknown")
@@ -25,18 +29,22 @@ Lessons: {state['episode_memory']}
         logger.debug(f"[INCIDENT-{incident_id}] [LEARNING] Adding incident to long-term memory...")
         logger.debug(f"[INCIDENT-{incident_id}] [LEARNING] Memory record: {memory_record[:100]}...")
         
-        rag.add_document(
+        await rag.aadd_document(
             memory_record,
             metadata={
+                # Lets consolidated summaries link back to their source incidents
+                "incident_id": incident_id,
                 "store_id": store_id,
                 "incident_type": incident_type,
-                "severity": severity
+                "severity": severity,
+                # Read back by memory_decay.decay_score when ranking and compacting memories
+                "timestamp": time.time()
             }
         )
         
         logger.info(f"[INCIDENT-{incident_id}] [LEARNING] Long-term memory updated - Type: {incident_type}, Severity: {severity}, Outcome: {'resolved' if resolved else 'escalated'}")
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [LEARNING] Failed to update long-term memory: {str(e)}", exc_info=True)
-        state["episode_memory"].append(f"LEARNING ERROR: {str(e)}")
+        return {"episode_memory": [f"LEARNING ERROR: {str(e)}"]}
     
-    return state
+    return {}
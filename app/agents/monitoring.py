@@ -3,7 +3,7 @@ from config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
-def monitoring_node(state):
+async def monitoring_node(state):
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [MONITORING] Starting monitoring node")
     
@@ -15,11 +15,10 @@ def monitoring_node(state):
     if risk_score > 0.85:
         new_severity = current_severity + 1
         logger.warning(f"[INCIDENT-{incident_id}] [MONITORING] High risk detected ({risk_score}) - Escalating severity from {current_severity} to {new_severity}")
-        state["severity"] = new_severity
-        state["resolved"] = False
+        updates = {"severity": new_severity, "resolved": False}
     else:
         logger.info(f"[INCIDENT-{incident_id}] [MONITORING] Risk score acceptable ({risk_score}) - Marking as resolved")
-        state["resolved"] = True
+        updates = {"resolved": True}
     
-    logger.info(f"[INCIDENT-{incident_id}] [MONITORING] Monitoring completed - Resolved: {state['resolved']}")
-    return state
+    logger.info(f"[INCIDENT-{incident_id}] [MONITORING] Monitoring completed - Resolved: {updates['resolved']}")
+    return updates
@@ -1,14 +1,16 @@
 import logging
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
+from agents.rag_queries import planning_query
 
 logger = get_logger(__name__)
 
-def response_planning_node(state):
+async def response_planning_node(state, config: RunnableConfig):
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [PLANNING] Starting response planning node")
 
-    llm = state["llm"]
-    rag = state["rag_engine"]
+    llm = config["configurable"]["llm"]
+    rag = config["configurable"]["rag_engine"]
 
     incident_type = state.get("incident_type", "unknown")
     severity = state.get("severity", 0)
@@ -18,9 +20,7 @@ def response_planning_node(state):
         f"[INCIDENT-{incident_id}] [PLANNING] Retrieving SOPs for "
         f"type={incident_type}, severity={severity}"
     )
-    sop_context = rag.query(
-        f"Standard operating procedures for {incident_type} incident with severity {severity}"
-    )["context"]
+    sop_context = (await rag.aquery(**planning_query(state)))["context"]
 
     logger.debug(
         f"[INCIDENT-{incident_id}] [PLANNING] SOP context length: {len(sop_context)} chars"
@@ -53,23 +53,24 @@ Generate a clear, ordered, step-by-step response plan.
 - Avoid explanations, output only steps
 """
 
+    episode_memory = []
     try:
         logger.debug(f"[INCIDENT-{incident_id}] [PLANNING] Invoking LLM...")
-        plan_response = llm.invoke(prompt)
+        plan_response = await llm.ainvoke(prompt)
         
         plan_text = plan_response.content
         
-        state["plan"] = [
+        plan = [
             step.strip("- ").strip()
             for step in plan_text.split("\n")
             if step.strip()
 ]
 
         logger.info(
-            f"[INCIDENT-{incident_id}] [PLANNING] Generated {len(state['plan'])} plan steps"
+            f"[INCIDENT-{incident_id}] [PLANNING] Generated {len(plan)} plan steps"
         )
         logger.debug(
-            f"[INCIDENT-{incident_id}] [PLANNING] Plan: {state['plan']}"
+            f"[INCIDENT-{incident_id}] [PLANNING] Plan: {plan}"
         )
 
     except Exception as e:
@@ -77,8 +78,8 @@ Generate a clear, ordered, step-by-step response plan.
             f"[INCIDENT-{incident_id}] [PLANNING] Plan generation failed: {e}",
             exc_info=True
         )
-        state["plan"] = []
-        state["episode_memory"].append(f"PLANNING ERROR: {str(e)}")
+        plan = []
+        episode_memory.append(f"PLANNING ERROR: {str(e)}")
 
-    state["episode_memory"].append("Response plan generated")
-    return state
+    episode_memory.append("Response plan generated")
+    return {"plan": plan, "episode_memory": episode_memory}
@@ -0,0 +1,119 @@
+import logging
+from config.logging_config import get_logger
+from rag.config import NODE_CONTEXT_TOKENS, MEMORY
+from rag.filters import metadata_filter
+
+logger = get_logger(__name__)
+
+# RAG lookups made by the graph nodes, as rag.aquery() keyword arguments.
+# Nodes and the prefetch below build them from the same state, so prefetched
+# results are found under the exact cache key the node asks for.
+
+
+def fused_incident_type(state):
+    """Incident type as classified by fusion, or None before fusion has run."""
+    return (state.get("fused_incident") or {}).get("incident_type") or state.get("incident_type")
+
+
+def _incident_scope(state) -> dict:
+    """Semantic cache scope of queries built from the incident: a near-identical
+    query for another severity or incident type must not reuse their context."""
+    return {"incident_type": fused_incident_type(state), "severity": state.get("severity")}
+
+
+def memory_query(state) -> dict:
+    store_id = state.get("store_id", "unknown")
+    incident_type = fused_incident_type(state) or "unknown"
+    severity = state.get("severity", "unknown")
+    vision_signal = state.get("vision_signal")
+    audio_signal = state.get("audio_signal")
+
+    # High-quality agentic query
+    query = f"""
+You are retrieving memory for a retail incident response system.
+
+Store ID: {store_id}
+Incident Type: {incident_type}
+Estimated Severity: {severity}
+
+Observed Signals:
+Vision Analysis: {vision_signal}
+Audio Analysis: {audio_signal}
+
+Task:
+- Retrieve similar historical incidents.
+- Identify what actions were taken.
+- Highlight outcomes and lessons learned.
+- Surface relevant SOPs or escalation guidelines.
+
+Return only relevant factual context.
+"""
+    # Only this store's history; the filter runs inside the vector search
+    return {
+        "query_text": query,
+        "max_tokens": NODE_CONTEXT_TOKENS["memory"],
+        "namespace": MEMORY,
+        "where": metadata_filter(store_id=store_id, incident_type=fused_incident_type(state)),
+        "scope": _incident_scope(state),
+    }
+
+
+def risk_query(state) -> dict:
+    return {"query_text": "retail safety escalation rules", "max_tokens": NODE_CONTEXT_TOKENS["risk"]}
+
+
+def planning_query(state) -> dict:
+    incident_type = fused_incident_type(state) or "unknown"
+    severity = state.get("severity", 0)
+    return {
+        "query_text": f"Standard operating procedures for {incident_type} incident with severity {severity}",
+        "max_tokens": NODE_CONTEXT_TOKENS["planning"],
+        "scope": _incident_scope(state),
+    }
+
+
+def explain_query(state) -> dict:
+    severity = state.get("severity", 0)
+    incident_type = fused_incident_type(state) or "unknown"
+
+    # High-quality, targeted RAG query
+    query = f"""
+Retail safety and security policy justification.
+
+Incident type: {incident_type}
+Severity level: {severity}
+
+Retrieve:
+- Relevant policy clauses
+- Risk classification rules
+- Escalation criteria
+- Any similar precedent incidents
+"""
+    return {"query_text": query, "max_tokens": NODE_CONTEXT_TOKENS["explain"], "scope": _incident_scope(state)}
+
+
+def self_reflect_query(state) -> dict:
+    incident_type = fused_incident_type(state) or "unknown"
+    severity = state.get("severity", 0)
+    return {
+        "query_text": f"Similar incidents to {incident_type} with severity {severity}",
+        "max_tokens": NODE_CONTEXT_TOKENS["self_reflect"],
+        "namespace": MEMORY,
+        "where": metadata_filter(store_id=state.get("store_id"), incident_type=fused_incident_type(state)),
+        "scope": _incident_scope(state),
+    }
+
+
+# Queries that can be built at the entry node, and those that need the final severity:
+# monitor still raises it for high-risk incidents, so they are fetched after it
+ENTRY_QUERIES = (memory_query, risk_query)
+POST_MONITOR_QUERIES = (explain_query, self_reflect_query)
+
+
+async def prefetch(rag, state, builders):
+    """Fetch the given nodes' RAG lookups in one batch; on failure each node queries on its own."""
+    incident_id = state.get("incident_id", "unknown")
+    try:
+        await rag.aprefetch([build(state) for build in builders])
+    except Exception as e:
+        logger.warning(f"[INCIDENT-{incident_id}] [RAG] Retrieval prefetch failed: {e}")
@@ -1,14 +1,15 @@
 import json
 import logging
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
-def response_llm_node(state):
+async def response_llm_node(state, config: RunnableConfig):
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [RESPONSE-LLM] Starting response LLM node")
     
-    llm = state["llm"]
+    llm = config["configurable"]["llm"]
     severity = state.get("severity", 0)
     
     prompt = f"""
@@ -31,16 +32,48 @@ Tone MUST match severity {severity}. DO NOT explain/annotate.
 """
     try:
         logger.debug(f"[INCIDENT-{incident_id}] [RESPONSE-LLM] Invoking LLM for action generation (severity: {severity})...")
-        resp = llm.invoke(prompt)
-        state["execution_actions"] = json.loads(resp if isinstance(resp, str) else resp.content)
+        resp = await llm.ainvoke(prompt)
+        execution_actions = json.loads(resp if isinstance(resp, str) else resp.content)
         
-        enabled_actions = [k for k, v in state["execution_actions"].items() if v.get("enabled", False)]
+        enabled_actions = [k for k, v in execution_actions.items() if v.get("enabled", False)]
         logger.info(f"[INCIDENT-{incident_id}] [RESPONSE-LLM] Generated execution actions - Enabled: {enabled_actions}")
-        logger.debug(f"[INCIDENT-{incident_id}] [RESPONSE-LLM] Actions: {state['execution_actions']}")
+        logger.debug(f"[INCIDENT-{incident_id}] [RESPONSE-LLM] Actions: {execution_actions}")
         
-        state["episode_memory"].append("Execution messages generated")
+        return {
+            "execution_actions": execution_actions,
+            "episode_memory": ["Execution messages generated"],
+        }
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [RESPONSE-LLM] Action generation failed: {str(e)}", exc_info=True)
-        state["execution_actions"] = {}
-        state["episode_memory"].append(f"LLM JSON ERROR: {str(e)}")
-    return state
+        return {"execution_actions": {}, "episode_memory": [f"LLM JSON ERROR: {str(e)}"]}
+
+
+def templated_actions(state) -> dict:
+    """Execution actions built from fixed templates, used when there is no time for the LLM."""
+    incident_id = state.get("incident_id", "unknown")
+    store_id = state.get("store_id", "unknown")
+    severity = state.get("severity") or 3
+    incident_type = (state.get("fused_incident") or {}).get("incident_type") or state.get("incident_type") or "incident"
+    plan = state.get("plan") or []
+
+    summary = f"{incident_type} (severity {severity}) at store {store_id}"
+    steps = "\n".join(f"- {step}" for step in plan) or "- Follow the store's standard operating procedures"
+    execution_actions = {
+        "announce": {
+            "enabled": severity >= 3,
+            "text": f"Attention please. Store staff, please respond to a reported {incident_type}.",
+        },
+        "email": {
+            "enabled": True,
+            "subject": f"[Severity {severity}] Incident alert: {incident_type}",
+            "body": f"Incident {incident_id}: {summary}.\n\nResponse plan:\n{steps}",
+        },
+        "call": {
+            "enabled": severity >= 4,
+            "subject": f"Incident alert: {incident_type}",
+            "script": f"This is an automated alert. A {incident_type} with severity {severity} has been reported at store {store_id}. Please respond immediately.",
+        },
+        "emergency": {"enabled": severity >= 5},
+    }
+    logger.info(f"[INCIDENT-{incident_id}] [RESPONSE-LLM] Using templated execution actions for {summary}")
+    return {"execution_actions": execution_actions, "episode_memory": ["Templated execution messages generated"]}
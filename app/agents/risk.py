@@ -1,19 +1,22 @@
 import json
 import logging
 from state import IncidentState
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
+from agents.rag_queries import risk_query
+from budget import tighten_deadline
 
 logger = get_logger(__name__)
 
-def risk_node(state: IncidentState) -> IncidentState:
+async def risk_node(state: IncidentState, config: RunnableConfig) -> dict:
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [RISK] Starting risk assessment node")
     
-    rag = state["rag_engine"]
-    llm = state["llm"]
+    rag = config["configurable"]["rag_engine"]
+    llm = config["configurable"]["llm"]
     
     logger.debug(f"[INCIDENT-{incident_id}] [RISK] Querying RAG for safety policies...")
-    policies = rag.query("retail safety escalation rules")
+    policies = (await rag.aquery(**risk_query(state)))["context"]
 
     prompt = f"""
 You are a careful, thorough retail RISK ASSESSMENT agent working for autonomous incident systems.
@@ -34,18 +37,23 @@ POLICIES:
 """
     try:
         logger.debug(f"[INCIDENT-{incident_id}] [RISK] Invoking LLM for risk assessment...")
-        resp = llm.invoke(prompt)
+        resp = await llm.ainvoke(prompt)
         result = json.loads(resp if isinstance(resp, str) else resp.content)
-        state["severity"] = result["severity"]
-        state["risk_score"] = result["risk_score"]
-        state["requires_human"] = result["requires_human"]
         
         logger.info(f"[INCIDENT-{incident_id}] [RISK] Risk assessment completed - Severity: {result['severity']}, Risk Score: {result['risk_score']}, Requires Human: {result['requires_human']}")
+        return {
+            "severity": result["severity"],
+            "risk_score": result["risk_score"],
+            "requires_human": result["requires_human"],
+            "deadline_at": tighten_deadline(state, result["severity"]),
+        }
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [RISK] Risk assessment failed: {str(e)}", exc_info=True)
-        state["requires_human"] = True
-        state["risk_score"] = 0.5
-        state["severity"] = 3
-        state["episode_memory"].append(f"RISK JSON ERROR: {str(e)}")
         logger.warning(f"[INCIDENT-{incident_id}] [RISK] Using default values: severity=3, risk_score=0.5, requires_human=True")
-    return state
+        return {
+            "requires_human": True,
+            "risk_score": 0.5,
+            "severity": 3,
+            "deadline_at": tighten_deadline(state, 3),
+            "episode_memory": [f"RISK JSON ERROR: {str(e)}"],
+        }
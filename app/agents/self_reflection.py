@@ -1,22 +1,21 @@
 import logging
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
+from agents.rag_queries import self_reflect_query
 
 logger = get_logger(__name__)
 
-def self_reflection_node(state):
+async def self_reflection_node(state, config: RunnableConfig):
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Starting self-reflection node")
     
-    llm = state["llm"]
-    rag = state["rag_engine"]
+    llm = config["configurable"]["llm"]
+    rag = config["configurable"]["rag_engine"]
     incident_type = state.get("incident_type", "unknown")
     severity = state.get("severity", 0)
 
     logger.debug(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Querying RAG for similar historical incidents...")
-    historical = rag.query(
-        f"Similar incidents to {incident_type} "
-        f"with severity {severity}"
-    )["context"]
+    historical = (await rag.aquery(**self_reflect_query(state)))["context"]
     logger.debug(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Retrieved {len(historical)} chars of historical context")
 
     prompt = f"""
@@ -51,23 +50,25 @@ Return:
 
     try:
         logger.debug(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Invoking LLM for reflection...")
-        output = llm.invoke(prompt)
+        output = await llm.ainvoke(prompt)
 
-        state["reflection"] = output
-        print(output)
-        message_text = output.content
-        state["reflection_tags"] = [
+        reflection = output.content
+        message_text = reflection
+        reflection_tags = [
             tag.strip()
             for tag in ["severity_tuning", "faster_escalation", "deescalation"]
             if tag.lower() in message_text.lower()
         ]
         
-        logger.info(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Reflection completed - Tags: {state['reflection_tags']}")
-        logger.debug(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Reflection summary: {output.content[:100]}...")
+        logger.info(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Reflection completed - Tags: {reflection_tags}")
+        logger.debug(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Reflection summary: {reflection[:100]}...")
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [SELF-REFLECTION] Reflection failed: {str(e)}", exc_info=True)
-        state["reflection"] = f"Reflection error: {str(e)}"
-        state["reflection_tags"] = []
+        reflection = f"Reflection error: {str(e)}"
+        reflection_tags = []
 
-    state["episode_memory"].append("Self-reflection completed")
-    return state
+    return {
+        "reflection": reflection,
+        "reflection_tags": reflection_tags,
+        "episode_memory": ["Self-reflection completed"],
+    }
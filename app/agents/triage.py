@@ -0,0 +1,66 @@
+import logging
+from config.graph_config import TRIAGE_CONFIDENCE_THRESHOLD
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# modality -> (observation key, signal key)
+MODALITIES = {
+    "vision": ("vision_observation", "vision_signal"),
+    "audio": ("audio_observation", "audio_signal"),
+    "video": ("video_observation", "video_signal"),
+}
+
+def _confidence(signal):
+    try:
+        return float(signal.get("confidence", 0.0))
+    except (TypeError, ValueError):
+        return 0.0
+
+def triage_assessment(state):
+    """Decide whether the perception signals warrant the full incident pipeline.
+
+    Returns (is_incident, top_confidence, reason). A modality whose observation
+    was provided but whose analysis produced no signal fails open, so a
+    perception error never silently drops a real incident.
+    """
+    top_confidence = 0.0
+    for modality, (observation_key, signal_key) in MODALITIES.items():
+        signal = state.get(signal_key) or {}
+        if state.get(observation_key) and not signal:
+            return True, top_confidence, f"{modality} analysis unavailable"
+        if signal.get("is_incident"):
+            confidence = _confidence(signal)
+            top_confidence = max(top_confidence, confidence)
+            if confidence >= TRIAGE_CONFIDENCE_THRESHOLD:
+                return True, confidence, f"{modality} reported incident ({confidence:.2f})"
+    return False, top_confidence, f"no modality reported an incident above {TRIAGE_CONFIDENCE_THRESHOLD}"
+
+async def triage_node(state):
+    incident_id = state.get("incident_id", "unknown")
+    is_incident, confidence, reason = triage_assessment(state)
+    logger.info(f"[INCIDENT-{incident_id}] [TRIAGE] {'Incident' if is_incident else 'No incident'} - {reason}")
+    return {
+        "confidence": confidence,
+        "episode_memory": [f"Triage: {reason}"],
+    }
+
+def route_after_triage(state):
+    is_incident, _, _ = triage_assessment(state)
+    return "fusion" if is_incident else "no_action"
+
+async def no_action_node(state):
+    """Lightweight terminal record for submissions that triage as benign."""
+    incident_id = state.get("incident_id", "unknown")
+    logger.info(f"[INCIDENT-{incident_id}] [TRIAGE] Recording no-action outcome, skipping incident pipeline")
+    return {
+        "incident_type": "no_incident",
+        "severity": 0,
+        "risk_score": 0.0,
+        "requires_human": False,
+        "plan": [],
+        "execution_actions": {},
+        "resolved": True,
+        "explanation": "No perception agent reported an incident above the triage confidence threshold; no action taken.",
+        "episode_memory": ["No action required"],
+    }
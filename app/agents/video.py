@@ -1,33 +1,30 @@
 import json
+import asyncio
 import logging
 import cv2
 import numpy as np
-import concurrent.futures
 from state import IncidentState
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
 from services.azure_vision import process_image
+from services.media_store import video_path
 # from services.azure_video_indexer import download_thumbnail, get_video_thumbnails  # Commented out - using direct frame extraction
 
 logger = get_logger(__name__)
 
-def extract_frames_from_video(video_bytes: bytes, frame_interval: int = 30) -> list:
-    """Extract frames from video bytes at specified intervals."""
+# Upper bound on in-flight Azure Vision frame requests per video
+MAX_CONCURRENT_FRAMES = 4
+
+def extract_frames_from_video(video_file: str, frame_interval: int = 30) -> list:
+    """Extract frames from a video file at specified intervals."""
     frames = []
-    import tempfile
-    import os
     
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
-            temp_file.write(video_bytes)
-            temp_path = temp_file.name
-        
         # Open video with OpenCV
-        cap = cv2.VideoCapture(temp_path)
+        cap = cv2.VideoCapture(video_file)
         
         if not cap.isOpened():
             logger.error("Failed to open video file")
-            os.unlink(temp_path)
             return frames
         
         frame_count = 0
@@ -46,7 +43,6 @@ def extract_frames_from_video(video_bytes: bytes, frame_interval: int = 30) -> l
             frame_count += 1
         
         cap.release()
-        os.unlink(temp_path)  # Clean up temp file
         logger.info(f"Extracted {len(frames)} frames from video")
         return frames
     
@@ -88,93 +84,72 @@ def extract_frames_from_video(video_bytes: bytes, frame_interval: int = 30) -> l
         'detected_objects': objects[:10]  # Top 10 objects
     }
 
-def video_react_node(state: IncidentState) -> IncidentState:
+async def video_react_node(state: IncidentState, config: RunnableConfig) -> dict:
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [VIDEO] Starting video analysis node")
 
     video_data = state.get("video_observation")
     if not video_data:
         logger.warning(f"[INCIDENT-{incident_id}] [VIDEO] No video observation provided")
-        state["video_signal"] = {}
-        return state
+        return {"video_signal": {}}
 
-    # NEW: Extract video bytes and process frames directly
-    video_bytes = video_data.get("video_bytes")
-    if not video_bytes:
-        logger.warning(f"[INCIDENT-{incident_id}] [VIDEO] No video bytes provided")
-        state["video_signal"] = {}
-        return state
+    # The state carries only a reference to the video the API stored
+    video_ref = video_data.get("video_ref")
+    if not video_ref:
+        logger.warning(f"[INCIDENT-{incident_id}] [VIDEO] No video data provided")
+        return {"video_signal": {}}
+    video_file = video_path(video_ref)
+    if not video_file:
+        logger.error(f"[INCIDENT-{incident_id}] [VIDEO] Stored video '{video_ref}' not found")
+        return {"video_signal": {}, "episode_memory": [f"VIDEO ERROR: stored video '{video_ref}' not found"]}
 
     logger.info(f"[INCIDENT-{incident_id}] [VIDEO] Extracting frames from video for parallel vision analysis")
 
-    # Extract frames from video
-    frames = extract_frames_from_video(video_bytes, frame_interval=30)  # Extract every 30th frame
+    # Extract frames from video (OpenCV decoding is CPU-bound, keep it off the event loop)
+    frames = await asyncio.to_thread(extract_frames_from_video, video_file, 30)  # Extract every 30th frame
 
     if not frames:
         logger.warning(f"[INCIDENT-{incident_id}] [VIDEO] No frames extracted from video")
-        state["video_signal"] = {}
-        return state
+        return {"video_signal": {}}
 
     logger.info(f"[INCIDENT-{incident_id}] [VIDEO] Processing {len(frames)} frames in parallel")
 
-    # Process frames synchronously using threading for parallelism
-    import concurrent.futures
-    
-    def process_frame_sync(frame_data: bytes, frame_id: str) -> dict:
-        """Process a single frame synchronously."""
-        try:
-            logger.debug(f"Processing frame {frame_id}")
-            result = process_image(frame_data)
-            result['frame_id'] = frame_id
-            
-            # Log significant findings
-            if result.get('processed', False):
-                objects_count = len(result.get('objects', []))
-                people_count = len(result.get('people', []))
-                caption = result.get('caption', {}).get('text', '')
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FRAMES)
+
+    async def process_frame(frame_data: bytes, frame_id: str) -> dict:
+        """Process a single frame on a worker thread."""
+        async with semaphore:
+            try:
+                logger.debug(f"Processing frame {frame_id}")
+                result = await asyncio.to_thread(process_image, frame_data)
+                result['frame_id'] = frame_id
                 
-                if objects_count > 0 or people_count > 0 or caption:
-                    logger.debug(f"Frame {frame_id} results: {objects_count} objects, {people_count} people, caption: {caption[:30]}...")
-            
-            return result
-        except Exception as e:
-            logger.error(f"Failed to process frame {frame_id}: {e}", exc_info=True)
-            return {
-                "frame_id": frame_id,
-                "processed": False,
-                "error": str(e),
-                "objects": [],
-                "people": [],
-                "text": "",
-                "caption": ""
-            }
+                # Log significant findings
+                if result.get('processed', False):
+                    objects_count = len(result.get('objects', []))
+                    people_count = len(result.get('people', []))
+                    caption = result.get('caption', {}).get('text', '')
+                    
+                    if objects_count > 0 or people_count > 0 or caption:
+                        logger.debug(f"Frame {frame_id} results: {objects_count} objects, {people_count} people, caption: {caption[:30]}...")
+                
+                return result
+            except Exception as e:
+                logger.error(f"Failed to process frame {frame_id}: {e}", exc_info=True)
+                return {
+                    "frame_id": frame_id,
+                    "processed": False,
+                    "error": str(e),
+                    "objects": [],
+                    "people": [],
+                    "text": "",
+                    "caption": ""
+                }
 
-    # Run parallel processing using ThreadPoolExecutor
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            # Submit all tasks
-            future_to_frame = {
-                executor.submit(process_frame_sync, frame_data, frame_id): (frame_id, frame_data)
-                for frame_id, frame_data in frames
-            }
-            
-            frame_results = []
-            for future in concurrent.futures.as_completed(future_to_frame):
-                try:
-                    result = future.result()
-                    frame_results.append(result)
-                except Exception as e:
-                    frame_id, _ = future_to_frame[future]
-                    logger.error(f"Frame {frame_id} processing failed: {e}")
-                    frame_results.append({
-                        "frame_id": frame_id,
-                        "processed": False,
-                        "error": str(e),
-                        "objects": [],
-                        "people": [],
-                        "text": "",
-                        "caption": ""
-                    })
+        frame_results = await asyncio.gather(
+            *(process_frame(frame_data, frame_id) for frame_id, frame_data in frames)
+        )
         
         logger.info(f"[INCIDENT-{incident_id}] [VIDEO] Processed {len(frame_results)} frames")
 
@@ -183,8 +158,7 @@ def video_react_node(state: IncidentState) -> IncidentState:
 
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [VIDEO] Frame processing failed: {str(e)}", exc_info=True)
-        state["video_signal"] = {}
-        return state
+        return {"video_signal": {}}
 
     # Log aggregated results
     logger.info("=== VIDEO ANALYSIS SUMMARY ===")
@@ -195,7 +169,7 @@ def video_react_node(state: IncidentState) -> IncidentState:
     logger.info("=== END VIDEO ANALYSIS SUMMARY ===")
 
     # Use LLM to analyze aggregated results for incidents
-    llm = state["llm"]
+    llm = config["configurable"]["llm"]
     analysis_prompt = f"""
 You are a highly reliable VIDEO incident detector for a retail AI system.
 Given aggregated visual observations from video frames, output strict JSON object with these fields only:
@@ -213,13 +187,13 @@ Do NOT add any explanation outside JSON.
 """
 
     try:
-        resp = llm.invoke(analysis_prompt)
-        state["video_signal"] = json.loads(resp if isinstance(resp, str) else resp.content)
+        resp = await llm.ainvoke(analysis_prompt)
+        video_signal = json.loads(resp if isinstance(resp, str) else resp.content)
 
-        is_incident = state["video_signal"].get("is_incident", False)
-        scenario = state["video_signal"].get("scenario_label", "unknown")
-        confidence = state["video_signal"].get("confidence", 0.0)
-        evidence = state["video_signal"].get("evidence_used", "")
+        is_incident = video_signal.get("is_incident", False)
+        scenario = video_signal.get("scenario_label", "unknown")
+        confidence = video_signal.get("confidence", 0.0)
+        evidence = video_signal.get("evidence_used", "")
         
         logger.info("=== VIDEO INCIDENT DETECTION RESULT ===")
         logger.info(f"Incident Detected: {is_incident}")
@@ -227,13 +201,11 @@ Do NOT add any explanation outside JSON.
         logger.info(f"Confidence: {confidence:.2f}")
         logger.info(f"Evidence: {evidence}")
         logger.info("=== END VIDEO INCIDENT DETECTION ===")
+        return {"video_signal": video_signal}
 
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [VIDEO] Video analysis failed: {str(e)}", exc_info=True)
-        state["video_signal"] = {}
-        state.setdefault("episode_memory", []).append(f"VIDEO ANALYSIS ERROR: {str(e)}")
-
-    return state
+        return {"video_signal": {}, "episode_memory": [f"VIDEO ANALYSIS ERROR: {str(e)}"]}
 
 def aggregate_frame_results(frame_results: list) -> dict:
     """Aggregate results from multiple frames."""
@@ -1,21 +1,21 @@
 import json
 import logging
 from state import IncidentState
+from langchain_core.runnables import RunnableConfig
 from config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
-def vision_react_node(state: IncidentState) -> IncidentState:
+async def vision_react_node(state: IncidentState, config: RunnableConfig) -> dict:
     incident_id = state.get("incident_id", "unknown")
     logger.info(f"[INCIDENT-{incident_id}] [VISION] Starting vision analysis node")
     
-    llm = state["llm"]
+    llm = config["configurable"]["llm"]
     observation = state.get("vision_observation")
     
     if not observation:
         logger.warning(f"[INCIDENT-{incident_id}] [VISION] No vision observation provided")
-        state["vision_signal"] = {}
-        return state
+        return {"vision_signal": {}}
     
     logger.debug(f"[INCIDENT-{incident_id}] [VISION] Processing vision observation...")
     
@@ -35,16 +35,15 @@ Do NOT add any explanation outside JSON.
 """
     try:
         logger.debug(f"[INCIDENT-{incident_id}] [VISION] Invoking LLM for vision analysis...")
-        resp = llm.invoke(prompt)
+        resp = await llm.ainvoke(prompt)
         print(resp)
-        state["vision_signal"] = json.loads(resp if isinstance(resp, str) else resp.content)
+        vision_signal = json.loads(resp if isinstance(resp, str) else resp.content)
         
-        is_incident = state["vision_signal"].get("is_incident", False)
-        scenario = state["vision_signal"].get("scenario_label", "unknown")
-        confidence = state["vision_signal"].get("confidence", 0.0)
+        is_incident = vision_signal.get("is_incident", False)
+        scenario = vision_signal.get("scenario_label", "unknown")
+        confidence = vision_signal.get("confidence", 0.0)
         logger.info(f"[INCIDENT-{incident_id}] [VISION] Vision analysis completed - Incident: {is_incident}, Scenario: {scenario}, Confidence: {confidence}")
+        return {"vision_signal": vision_signal}
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [VISION] Vision analysis failed: {str(e)}", exc_info=True)
-        state["vision_signal"] = {}
-        state.setdefault("episode_memory",[]).append(f"VISION JSON ERROR: {str(e)}")
-    return state
+        return {"vision_signal": {}, "episode_memory": [f"VISION JSON ERROR: {str(e)}"]}
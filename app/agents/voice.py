@@ -2,22 +2,23 @@ import os
 import logging
 import azure.cognitiveservices.speech as speechsdk
 from config.logging_config import get_logger
+from metrics import record_external_call
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = get_logger(__name__)
 
-def voice_execution_node(state):
+async def voice_execution_node(state):
     incident_id = state.get("incident_id", "unknown")
     
     if not state.get("execution_actions") or not state["execution_actions"].get("announce"):
         logger.debug(f"[INCIDENT-{incident_id}] [VOICE] No announce action in execution_actions, skipping")
-        return state
+        return {}
     
     a = state["execution_actions"]["announce"]
     if not a.get("enabled", False):
         logger.debug(f"[INCIDENT-{incident_id}] [VOICE] Voice announcement disabled, skipping")
-        return state
+        return {}
 
     logger.info(f"[INCIDENT-{incident_id}] [VOICE] Starting voice announcement")
     
@@ -26,8 +27,7 @@ def voice_execution_node(state):
     
     if not azure_speech_key or not azure_region:
         logger.error(f"[INCIDENT-{incident_id}] [VOICE] Azure Speech credentials not configured")
-        state.setdefault("execution_results", {})["voice"] = {"status": "failed", "error": "Credentials missing"}
-        return state
+        return {"execution_results": {"voice": {"status": "failed", "error": "Credentials missing"}}}
 
     try:
         text = a.get("text", "")
@@ -39,12 +39,11 @@ def voice_execution_node(state):
                 region=azure_region
             )
         )
+        record_external_call("azure_speech")
         synthesizer.speak_text_async(text)
         
         logger.info(f"[INCIDENT-{incident_id}] [VOICE] Voice announcement completed")
-        state.setdefault("execution_results", {})["voice"] = {"status": "sent", "text": text}
+        return {"execution_results": {"voice": {"status": "sent", "text": text}}}
     except Exception as e:
         logger.error(f"[INCIDENT-{incident_id}] [VOICE] Voice announcement failed: {str(e)}", exc_info=True)
-        state.setdefault("execution_results", {})["voice"] = {"status": "failed", "error": str(e)}
-    
-    return state
+        return {"execution_results": {"voice": {"status": "failed", "error": str(e)}}}
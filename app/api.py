@@ -1,18 +1,30 @@
 from fastapi import FastAPI, File, UploadFile, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uuid
+import time
+import asyncio
 import logging
 from langchain_openai import AzureChatOpenAI
 import base64
 from pydantic import ValidationError
-from schemas import IncidentCreateRequest, IncidentCreateResponse, HumanDecisionRequest
+from typing import List
+from schemas import IncidentCreateRequest, IncidentCreateResponse, IncidentStatusResponse, IncidentBatchResponse, HumanDecisionRequest
 from graph import incident_graph
+from incident_queue import IncidentJobQueue, AWAITING_HUMAN, COMPLETED, FAILED, INCIDENT_BATCH_CONCURRENCY, INCIDENT_BATCH_MAX_SIZE
+from metrics import TokenUsageCallback, summarize_node_metrics, render_metrics
+from budget import start_budget
+from checkpointer import delete_checkpoints
 from openai import AzureOpenAI
 from rag.loader import load_store_policy
 from rag.rag_engine import RAGEngine
+from rag.vectorstore import create_vector_store
+from rag.config import MEMORY_COLLECTION, MEMORY, MEMORY_COMPACTION_INTERVAL_SECONDS, MEMORY_CONSOLIDATION_MIN_CLUSTER
+from rag.memory_compaction import compact_memories
+from rag.memory_consolidation import consolidate_memories
 from config.logging_config import setup_logging, get_logger
 from services.azure_vision import process_image, decode_base64_image
+from services.media_store import save_video, delete_media
 from services.azure_speech import process_audio, decode_base64_audio
 # from services.azure_video_indexer import process_video  # Commented out - using direct frame extraction instead
 import os
@@ -40,24 +52,49 @@ llm = AzureChatOpenAI(
     api_version="2025-01-01-preview",
     deployment_name=AZURE_CHAT_DEPLOYMENT,
     temperature=0.2,
+    callbacks=[TokenUsageCallback()],
 )
 
 import os
 import json as _json
 
-vector_store = load_store_policy("rag/policy.txt")
-rag_engine = RAGEngine(vector_store)
-logger.info(f"RAG Engine initialized with {vector_store.collection.count()} policy documents")
+POLICY_PATH = "rag/policy.txt"
+vector_store, policy_keyword_index, policy_ingestion = load_store_policy(POLICY_PATH)
+memory_store = create_vector_store(MEMORY_COLLECTION)
+rag_engine = RAGEngine(vector_store, memory_store, policy_keyword_index, policy_ingestion, POLICY_PATH)
+logger.info(f"RAG Engine initialized with {vector_store.count()} policy documents (version {policy_ingestion['version']}) and {memory_store.count()} incident memories")
 
 app = FastAPI()
 logger.info("FastAPI application initialized")
 
+async def memory_compaction_loop():
+    """Evict decayed incident memories and consolidate similar ones, now and every MEMORY_COMPACTION_INTERVAL_SECONDS."""
+    while True:
+        try:
+            changed = await asyncio.to_thread(compact_memories, memory_store)
+            if MEMORY_CONSOLIDATION_MIN_CLUSTER > 0:
+                changed += await asyncio.to_thread(consolidate_memories, memory_store)
+            if changed:
+                rag_engine.invalidate(MEMORY)
+        except Exception as e:
+            logger.error(f"Memory compaction failed: {e}", exc_info=True)
+        await asyncio.sleep(MEMORY_COMPACTION_INTERVAL_SECONDS)
+
+memory_compaction_task = None
+
 @app.on_event("startup")
 async def startup_event():
+    global memory_compaction_task
     await connect_to_mongo()
+    await incident_queue.start()
+    if MEMORY_COMPACTION_INTERVAL_SECONDS > 0:
+        memory_compaction_task = asyncio.create_task(memory_compaction_loop())
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if memory_compaction_task:
+        memory_compaction_task.cancel()
+    await incident_queue.stop()
     await close_mongo_connection()
 
 app.add_middleware(
@@ -70,6 +107,16 @@ app.add_middleware(
 
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 
+def graph_config(incident_id: str) -> dict:
+    """Per-incident graph config: the checkpoint thread plus the shared engines."""
+    return {
+        "configurable": {
+            "thread_id": incident_id,
+            "rag_engine": rag_engine,
+            "llm": llm,
+        }
+    }
+
 def sanitize_state_for_json(state: dict) -> dict:
     """Remove or convert binary data from state to make it JSON-serializable."""
     if not isinstance(state, dict):
@@ -120,36 +167,41 @@ def health():
     logger.debug("Health check requested")
     return {"status": "ok"}
 
+@app.get("/metrics", tags=["System"])
+def metrics():
+    """Prometheus metrics: per-node latency, LLM tokens, embedding and external calls."""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+@app.post("/policy/reload", tags=["System"])
+async def reload_policy(current_user: User = Depends(get_current_user)):
+    """Re-ingest the policy file now and return the ingestion stats.
+
+    Every worker process also re-ingests the file on its next RAG lookup once its
+    mtime changes, so the other workers pick up an edit without this call.
+    """
+    if current_user.role != "manager":
+        raise HTTPException(status_code=403, detail="Access denied: only managers can reload the policy")
+    logger.info(f"Policy reload requested by user: {current_user.username}")
+    return await rag_engine.areload_policy()
+
 @app.get("/info", tags=["System"])
 def info():
     logger.debug("Info endpoint requested")
     return {
-        "available_endpoints": ["/auth/login", "/auth/register", "/incident", "/human/{incident_id}", "/health", "/info"],
+        "available_endpoints": ["/auth/login", "/auth/register", "/incident", "/incidents/batch", "/incident/{incident_id}/status", "/human/{incident_id}", "/health", "/info", "/metrics", "/policy/reload"],
         "description": "Retail Autonomous Incident System API with MongoDB and Authentication."
     }
 
-@app.post("/incident", response_model=IncidentCreateResponse, tags=["Incidents"])
-async def create_incident(payload: IncidentCreateRequest, current_user: User = Depends(get_current_user)):
-    """Create a new incident and run through initial state machine."""
-    # Check if user has access to the store
-    if current_user.store_id != payload.store_id:
-        raise HTTPException(status_code=403, detail="Access denied: Incident store does not match user store")
-
-    incident_id = str(uuid.uuid4())
-    logger.info(f"[INCIDENT-{incident_id}] Creating new incident for store: {payload.store_id} by user: {current_user.username}")
-    logger.debug(f"[INCIDENT-{incident_id}] Payload: store_id={payload.store_id}, signals={payload.signals}")
-    """Create a new incident and run through initial state machine."""
-    incident_id = str(uuid.uuid4())
-    logger.info(f"[INCIDENT-{incident_id}] Creating new incident for store: {payload.store_id}")
-    logger.debug(f"[INCIDENT-{incident_id}] Payload: store_id={payload.store_id}, signals={payload.signals}")
-    
+async def build_observations(incident_id: str, payload: IncidentCreateRequest) -> dict:
+    """Decode the base64 media in a request and run Azure preprocessing on it."""
     # Process vision observation if provided
     vision_observation = None
     if payload.vision_observation:
         try:
             logger.info(f"[INCIDENT-{incident_id}] Processing vision observation with Azure Vision...")
             image_bytes = decode_base64_image(payload.vision_observation)
-            vision_observation = process_image(image_bytes)
+            vision_observation = await asyncio.to_thread(process_image, image_bytes)
             logger.info(f"[INCIDENT-{incident_id}] Vision processing completed")
         except Exception as e:
             logger.error(f"[INCIDENT-{incident_id}] Vision processing failed: {e}", exc_info=True)
@@ -161,7 +213,7 @@ async def create_incident(payload: IncidentCreateRequest, current_user: User = D
         try:
             logger.info(f"[INCIDENT-{incident_id}] Processing audio observation with Azure Speech...")
             audio_bytes = decode_base64_audio(payload.audio_observation)
-            audio_observation = process_audio(audio_bytes)
+            audio_observation = await asyncio.to_thread(process_audio, audio_bytes)
             logger.info(f"[INCIDENT-{incident_id}] Audio processing completed")
         except Exception as e:
             logger.error(f"[INCIDENT-{incident_id}] Audio processing failed: {e}", exc_info=True)
@@ -171,25 +223,32 @@ async def create_incident(payload: IncidentCreateRequest, current_user: User = D
     video_observation = None
     if payload.video_observation:
         try:
-            logger.info(f"[INCIDENT-{incident_id}] Processing video observation - extracting frames for vision analysis...")
-            video_bytes = decode_base64_image(payload.video_observation)  # Reuse decode function
-            # NEW: Pass raw video bytes instead of using Azure Video Indexer
-            video_observation = {"video_bytes": video_bytes, "filename": "uploaded_video.mp4"}
-            logger.info(f"[INCIDENT-{incident_id}] Video bytes extracted for frame processing")
+            logger.info(f"[INCIDENT-{incident_id}] Video observation received - frames are extracted by the video agent")
+            # The state (and so every checkpoint) keeps only a reference to the stored video
+            video_bytes = decode_base64_image(payload.video_observation)
+            video_ref = await asyncio.to_thread(save_video, incident_id, video_bytes)
+            video_observation = {"video_ref": video_ref, "filename": "uploaded_video.mp4"}
         except Exception as e:
-            logger.error(f"[INCIDENT-{incident_id}] Video processing failed: {e}", exc_info=True)
+            logger.error(f"[INCIDENT-{incident_id}] Video storage failed: {e}", exc_info=True)
             video_observation = {"error": str(e), "processed": False}
-    
-    # Initialize complete state according to IncidentState TypedDict
-    state = {
+
+    return {
+        "vision_observation": vision_observation,
+        "audio_observation": audio_observation,
+        "video_observation": video_observation,
+    }
+
+def build_initial_state(incident_id: str, store_id: str, observations: dict, started_at: float = None) -> dict:
+    """Initialize complete state according to IncidentState TypedDict."""
+    return {
         # Identity
         "incident_id": incident_id,
-        "store_id": payload.store_id,
+        "store_id": store_id,
         
         # Observations (processed by Azure services)
-        "vision_observation": vision_observation,
-        "audio_observation": audio_observation,
-        "video_observation": video_observation,
+        "vision_observation": observations["vision_observation"],
+        "audio_observation": observations["audio_observation"],
+        "video_observation": observations["video_observation"],
         
         # ReAct judged signals (will be populated by vision/speech nodes)
         "vision_signal": None,
@@ -226,48 +285,193 @@ async def create_incident(payload: IncidentCreateRequest, current_user: User = D
         # Explainability (will be populated by explainability node)
         "explanation": None,
         
-        # Engines
-        "rag_engine": rag_engine,
-        "llm": llm,
-        
         # Reflection (will be populated by self-reflection node)
         "reflection": None,
         "reflection_tags": None,
+
+        # Latency budget (counted from started_at, tightened by the risk node once severity is known)
+        **start_budget(now=started_at),
+        "degraded": False,
+
+        # Instrumentation (populated by every node)
+        "node_metrics": {},
     }
-    
+
+def build_incident_fields(result_state: dict, status: str) -> dict:
+    """Incident document fields derived from a graph state."""
+    return {
+        "status": status,
+        "state": result_state,
+        "resolved": result_state.get("resolved", False),
+        "severity": result_state.get("severity"),
+        "risk_score": result_state.get("risk_score"),
+        "incident_type": result_state.get("incident_type"),
+        "plan": str(result_state.get("plan")),
+        "execution_results": str(result_state.get("execution_results")),
+        "reflection": result_state.get("reflection"),
+        "explanation": result_state.get("explanation"),
+        "degraded": result_state.get("degraded", False),
+        "metrics": summarize_node_metrics(result_state.get("node_metrics")),
+    }
+
+def build_incident_doc(incident_id: str, store_id: str, result_state: dict, status: str) -> dict:
+    """Build the MongoDB document for a graph run."""
+    return {"_id": incident_id, "store_id": store_id, **build_incident_fields(result_state, status)}
+
+async def run_incident_graph(incident_id: str, state: dict, job: dict = None):
+    """Run the graph for a new incident, recording node progress on the job.
+
+    Returns the resulting state and whether the run completed or paused for human review.
+    Checkpoints are kept only for runs paused for human review.
+    """
+    config = graph_config(incident_id)
+    running = []
+    try:
+        async for event in incident_graph.astream(state, config, stream_mode="tasks"):
+            if job is None:
+                continue
+            if "result" in event:
+                if event["name"] in running:
+                    running.remove(event["name"])
+                job["completed_nodes"].append(event["name"])
+            else:
+                running.append(event["name"])
+            job["current_node"] = running[-1] if running else None
+
+        snapshot = await incident_graph.aget_state(config)
+    except Exception:
+        # A failed run is never resumed
+        await delete_checkpoints(incident_graph.checkpointer, incident_id)
+        raise
+
+    status = AWAITING_HUMAN if "human" in snapshot.next else COMPLETED
+    if status == COMPLETED:
+        await delete_checkpoints(incident_graph.checkpointer, incident_id)
+    return snapshot.values, status
+
+async def run_incident(incident_id: str, payload: IncidentCreateRequest, job: dict = None):
+    """Preprocess observations and run the graph; returns the incident document and its status."""
+    # The latency budget covers Azure preprocessing as well as the graph
+    started_at = time.time()
+    observations = await build_observations(incident_id, payload)
+    state = build_initial_state(incident_id, payload.store_id, observations, started_at)
+
+    logger.info(f"[INCIDENT-{incident_id}] Invoking incident graph...")
+    try:
+        result_state, status = await run_incident_graph(incident_id, state, job)
+    finally:
+        # The video agent has run by now, even when the graph paused for human review
+        video_ref = (observations["video_observation"] or {}).get("video_ref")
+        if video_ref:
+            await asyncio.to_thread(delete_media, video_ref)
+    logger.info(f"[INCIDENT-{incident_id}] Graph execution finished with status '{status}'. Resolved: {result_state.get('resolved', False)}")
+    return build_incident_doc(incident_id, payload.store_id, result_state, status), status
+
+async def process_incident_job(job: dict):
+    """Queue processor: run the incident and persist the result."""
+    incident_id = job["incident_id"]
     try:
-        logger.info(f"[INCIDENT-{incident_id}] Invoking incident graph...")
-        result_state = incident_graph.invoke(state)
-        logger.info(f"[INCIDENT-{incident_id}] Graph execution completed. Resolved: {result_state.get('resolved', False)}")
-
-        # Save to MongoDB - create serializable state
-        serializable_state = {k: v for k, v in result_state.items() if k not in ['rag_engine', 'llm']}
-        # Handle reflection separately if it's an AIMessage
-        if 'reflection' in result_state and hasattr(result_state['reflection'], 'content'):
-            serializable_state['reflection'] = result_state['reflection'].content
-        elif 'reflection' in result_state:
-            serializable_state['reflection'] = str(result_state['reflection'])
-
-        incident_doc = {
-            "_id": incident_id,
-            "store_id": payload.store_id,
-            "state": serializable_state,
-            "resolved": result_state.get("resolved", False),
-            "severity": result_state.get("severity"),
-            "risk_score": result_state.get("risk_score"),
-            "incident_type": result_state.get("incident_type"),
-            "plan": str(result_state.get("plan")),
-            "execution_results": str(result_state.get("execution_results")),
-            "reflection": serializable_state.get("reflection"),
-            "explanation": result_state.get("explanation")
+        incident_doc, status = await run_incident(incident_id, job["payload"], job)
+    except Exception as e:
+        # Record the failure so the status endpoint still reports it once the job is evicted
+        await incidents_collection.insert_one(
+            {"_id": incident_id, "store_id": job["store_id"], "status": FAILED, "error": str(e)}
+        )
+        raise
+
+    await incidents_collection.insert_one(incident_doc)
+    logger.info(f"[INCIDENT-{incident_id}] Saved to database")
+    job["status"] = status
+
+incident_queue = IncidentJobQueue(process_incident_job)
+
+@app.post("/incident", response_model=IncidentCreateResponse, tags=["Incidents"])
+async def create_incident(payload: IncidentCreateRequest, current_user: User = Depends(get_current_user)):
+    """Queue a new incident for the state machine and return its id immediately."""
+    # Check if user has access to the store
+    if current_user.store_id != payload.store_id:
+        raise HTTPException(status_code=403, detail="Access denied: Incident store does not match user store")
+
+    incident_id = str(uuid.uuid4())
+    logger.info(f"[INCIDENT-{incident_id}] Creating new incident for store: {payload.store_id} by user: {current_user.username}")
+    logger.debug(f"[INCIDENT-{incident_id}] Payload: store_id={payload.store_id}, signals={payload.signals}")
+
+    try:
+        job = incident_queue.submit(incident_id, payload.store_id, payload)
+    except asyncio.QueueFull:
+        logger.warning(f"[INCIDENT-{incident_id}] Incident queue is full, rejecting")
+        raise HTTPException(status_code=503, detail="Incident queue is full, please retry later")
+
+    logger.info(f"[INCIDENT-{incident_id}] Queued for processing")
+    return {"incident_id": incident_id, "status": job["status"]}
+
+@app.post("/incidents/batch", response_model=IncidentBatchResponse, tags=["Incidents"])
+async def create_incident_batch(payloads: List[IncidentCreateRequest], current_user: User = Depends(get_current_user)):
+    """Process a buffered backlog of incidents in one request.
+
+    Graphs run concurrently (at most INCIDENT_BATCH_CONCURRENCY at a time) and every
+    result is written with a single insert_many. A failed incident is reported in the
+    response without aborting the rest of the batch.
+    """
+    if len(payloads) > INCIDENT_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: at most {INCIDENT_BATCH_MAX_SIZE} incidents per request")
+
+    # One store-access check for the whole batch
+    if any(payload.store_id != current_user.store_id for payload in payloads):
+        raise HTTPException(status_code=403, detail="Access denied: Incident store does not match user store")
+
+    logger.info(f"Processing batch of {len(payloads)} incidents for store: {current_user.store_id} by user: {current_user.username}")
+    semaphore = asyncio.Semaphore(INCIDENT_BATCH_CONCURRENCY)
+
+    async def run_one(payload: IncidentCreateRequest):
+        incident_id = str(uuid.uuid4())
+        async with semaphore:
+            try:
+                incident_doc, status = await run_incident(incident_id, payload)
+                return {"incident_id": incident_id, "status": status}, incident_doc
+            except Exception as e:
+                logger.error(f"[INCIDENT-{incident_id}] Batch incident failed: {str(e)}", exc_info=True)
+                return {"incident_id": incident_id, "status": FAILED, "error": str(e)}, None
+
+    outcomes = await asyncio.gather(*(run_one(payload) for payload in payloads))
+    incidents = [item for item, _ in outcomes]
+    incident_docs = [doc for _, doc in outcomes if doc is not None]
+
+    if incident_docs:
+        await incidents_collection.insert_many(incident_docs, ordered=False)
+    logger.info(f"Batch finished: {len(incident_docs)} stored, {len(payloads) - len(incident_docs)} failed")
+
+    return {
+        "total": len(payloads),
+        "stored": len(incident_docs),
+        "failed": len(payloads) - len(incident_docs),
+        "incidents": incidents,
+    }
+
+@app.get("/incident/{incident_id}/status", response_model=IncidentStatusResponse, tags=["Incidents"])
+async def get_incident_status(incident_id: str, current_user: User = Depends(get_current_user)):
+    """Report the processing status and current graph node of an incident."""
+    job = incident_queue.get(incident_id)
+    if job:
+        if job["store_id"] != current_user.store_id:
+            raise HTTPException(status_code=403, detail="Access denied: Incident store does not match user store")
+        return {
+            "incident_id": incident_id,
+            "status": job["status"],
+            "current_node": job["current_node"],
+            "completed_nodes": job["completed_nodes"],
+            "error": job["error"],
         }
-        await incidents_collection.insert_one(incident_doc)
-        logger.info(f"[INCIDENT-{incident_id}] Saved to database")
 
-        return {"incident_id": incident_id}
-    except Exception as e:
-        logger.error(f"[INCIDENT-{incident_id}] Graph execution failed: {str(e)}", exc_info=True)
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    # Not tracked in memory (evicted or processed by another worker) - fall back to the stored document
+    incident_doc = await incidents_collection.find_one({"_id": incident_id}, {"store_id": 1, "status": 1, "error": 1})
+    if not incident_doc:
+        raise HTTPException(status_code=404, detail="Incident not found")
+
+    if incident_doc["store_id"] != current_user.store_id:
+        raise HTTPException(status_code=403, detail="Access denied: Incident store does not match user store")
+
+    return {"incident_id": incident_id, "status": incident_doc.get("status", COMPLETED), "error": incident_doc.get("error")}
 
 @app.post("/human/{incident_id}", tags=["Incidents"])
 async def human_decision(incident_id: str, payload: HumanDecisionRequest, current_user: User = Depends(get_current_user)):
@@ -282,38 +486,33 @@ async def human_decision(incident_id: str, payload: HumanDecisionRequest, curren
     if incident_doc["store_id"] != current_user.store_id:
         raise HTTPException(status_code=403, detail="Access denied: Incident store does not match user store")
 
-    state = incident_doc["state"]
-    state["human_decision"] = payload.decision
-    # Add back the required objects for graph execution
-    state["rag_engine"] = rag_engine
-    state["llm"] = llm
+    config = graph_config(incident_id)
+    snapshot = await incident_graph.aget_state(config)
+    if "human" not in snapshot.next:
+        logger.warning(f"[INCIDENT-{incident_id}] Incident is not awaiting a human decision")
+        return JSONResponse(status_code=409, content={"error": "Incident is not awaiting a human decision."})
 
     try:
-        logger.info(f"[INCIDENT-{incident_id}] Resuming graph execution with human decision...")
-        updated_state = incident_graph.invoke(state)
+        logger.info(f"[INCIDENT-{incident_id}] Resuming graph execution at human review...")
+        # Record the decision on the paused checkpoint, then continue from there (human -> planning -> ...).
+        # Time spent waiting for the reviewer doesn't count: the rest of the run gets a fresh budget.
+        await incident_graph.aupdate_state(config, {
+            "human_decision": payload.decision,
+            **start_budget(snapshot.values.get("severity")),
+        })
+        updated_state = await incident_graph.ainvoke(None, config)
         logger.info(f"[INCIDENT-{incident_id}] Graph resumed successfully")
 
-        # Update in MongoDB - create serializable state
-        serializable_updated_state = {k: v for k, v in updated_state.items() if k not in ['rag_engine', 'llm']}
-        if 'reflection' in updated_state and hasattr(updated_state['reflection'], 'content'):
-            serializable_updated_state['reflection'] = updated_state['reflection'].content
-        elif 'reflection' in updated_state:
-            serializable_updated_state['reflection'] = str(updated_state['reflection'])
-
         await incidents_collection.update_one(
             {"_id": incident_id},
-            {"$set": {
-                "state": serializable_updated_state,
-                "resolved": updated_state.get("resolved", False),
-                "severity": updated_state.get("severity"),
-                "risk_score": updated_state.get("risk_score"),
-                "incident_type": updated_state.get("incident_type"),
-                "plan": str(updated_state.get("plan")),
-                "execution_results": str(updated_state.get("execution_results")),
-                "reflection": serializable_updated_state.get("reflection"),
-                "explanation": updated_state.get("explanation")
-            }}
+            {"$set": build_incident_fields(updated_state, COMPLETED)}
         )
+        # The final state is in the incident document; the checkpoints are no longer needed
+        await delete_checkpoints(incident_graph.checkpointer, incident_id)
+
+        job = incident_queue.get(incident_id)
+        if job:
+            job["status"] = COMPLETED
 
         return {"status":"resumed"}
     except Exception as e:
@@ -0,0 +1,78 @@
+"""
+Per-incident latency budget.
+
+Each run carries an absolute deadline in its state (deadline_at, epoch seconds).
+Nodes read what is left with remaining_budget(state). Nodes wrapped with
+budget_node are cut off when the deadline passes and return a fallback update
+instead, marking the incident as degraded: perception and reasoning nodes
+return neutral defaults, response_llm_node is replaced by templated actions,
+and explainability and reflection are skipped.
+"""
+import time
+import asyncio
+import inspect
+from typing import Callable, Dict, Optional
+from langchain_core.runnables import RunnableConfig
+from config.graph_config import LATENCY_BUDGET_SECONDS, SEVERITY_LATENCY_BUDGETS
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def budget_for(severity: Optional[int] = None) -> float:
+    """Budget in seconds for an incident of the given severity (None: not yet assessed)."""
+    if severity is None:
+        return LATENCY_BUDGET_SECONDS
+    return min(LATENCY_BUDGET_SECONDS, SEVERITY_LATENCY_BUDGETS.get(severity, LATENCY_BUDGET_SECONDS))
+
+
+def start_budget(severity: Optional[int] = None, now: Optional[float] = None) -> Dict[str, float]:
+    """State fields that start a new budget window."""
+    now = time.time() if now is None else now
+    return {"budget_started_at": now, "deadline_at": now + budget_for(severity)}
+
+
+def tighten_deadline(state, severity: int) -> Optional[float]:
+    """Deadline after severity is known: the severity budget counted from the run start."""
+    started_at = state.get("budget_started_at")
+    deadline_at = state.get("deadline_at")
+    if started_at is None or deadline_at is None:
+        return deadline_at
+    return min(deadline_at, started_at + budget_for(severity))
+
+
+def remaining_budget(state) -> float:
+    """Seconds left before the incident's deadline (inf when the run has no deadline)."""
+    deadline_at = state.get("deadline_at")
+    if deadline_at is None:
+        return float("inf")
+    return deadline_at - time.time()
+
+
+def budget_node(name: str, node, fallback: Callable[[dict], dict]):
+    """Wrap a graph node so it is skipped or cut off once the latency budget is spent."""
+    takes_config = "config" in inspect.signature(node).parameters
+
+    def degrade(state, reason: str) -> dict:
+        incident_id = state.get("incident_id", "unknown")
+        logger.warning(f"[INCIDENT-{incident_id}] [BUDGET] {name} {reason} - using degraded path")
+        update = dict(fallback(state))
+        update["degraded"] = True
+        update["episode_memory"] = update.get("episode_memory", []) + [f"LATENCY BUDGET: {name} {reason}"]
+        return update
+
+    # No functools.wraps, for the reason given in metrics.instrument_node
+    async def bounded(state, config: RunnableConfig):
+        remaining = remaining_budget(state)
+        if remaining <= 0:
+            return degrade(state, "skipped, budget exhausted")
+
+        logger.debug(f"[INCIDENT-{state.get('incident_id', 'unknown')}] [BUDGET] {name} starting with {remaining:.1f}s left")
+        try:
+            timeout = None if remaining == float("inf") else remaining
+            return await asyncio.wait_for(node(state, config) if takes_config else node(state), timeout=timeout)
+        except asyncio.TimeoutError:
+            return degrade(state, "timed out, budget exhausted")
+
+    bounded.__name__ = f"bounded_{getattr(node, '__name__', name)}"
+    return bounded
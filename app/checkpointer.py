@@ -0,0 +1,47 @@
+"""
+Checkpoint store for the incident graph.
+
+The graph pauses before the human review node; checkpoints let
+/human/{incident_id} resume exactly there instead of replaying the graph.
+
+Checkpoints are only needed while an incident can still be resumed: a thread's
+checkpoints are deleted once its run completes or fails, so the checkpoint
+collections only hold incidents awaiting a human decision.
+"""
+import os
+import asyncio
+from dotenv import load_dotenv
+from config.logging_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# "mongo" (default, shares the application database) or "memory" for local development
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "mongo")
+CHECKPOINT_DB_NAME = os.getenv("CHECKPOINT_DB_NAME", "")
+
+
+def get_checkpointer():
+    """Build the checkpointer selected by CHECKPOINT_BACKEND."""
+    if CHECKPOINT_BACKEND == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        logger.warning("Using in-memory graph checkpoints - paused incidents will not survive a restart")
+        return InMemorySaver()
+
+    from pymongo import MongoClient
+    from langgraph.checkpoint.mongodb import MongoDBSaver
+    from database import MONGODB_URL, DATABASE_NAME
+
+    db_name = CHECKPOINT_DB_NAME or DATABASE_NAME
+    logger.info(f"Using MongoDB graph checkpoints in database '{db_name}'")
+    return MongoDBSaver(MongoClient(MONGODB_URL), db_name=db_name)
+
+
+async def delete_checkpoints(checkpointer, thread_id: str):
+    """Delete every checkpoint of a thread that will not be resumed again."""
+    try:
+        # Run the (blocking, for MongoDB) delete off the event loop
+        await asyncio.to_thread(checkpointer.delete_thread, thread_id)
+    except Exception as e:
+        logger.warning(f"[INCIDENT-{thread_id}] Could not delete graph checkpoints: {e}")
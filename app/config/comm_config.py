@@ -12,6 +12,13 @@ TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "")  # Your Twilio number
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
 SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL", "alerts@yourdomain.com")
 
+# Per-channel dispatch deadlines (seconds)
+CHANNEL_TIMEOUTS = {
+    "voice": float(os.getenv("VOICE_TIMEOUT_SECONDS", "5")),
+    "email": float(os.getenv("EMAIL_TIMEOUT_SECONDS", "10")),
+    "call": float(os.getenv("CALL_TIMEOUT_SECONDS", "10")),
+}
+
 # Store-specific contact mappings (can be loaded from DB/config file)
 STORE_CONTACTS = {
     "store_1": {
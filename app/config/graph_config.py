@@ -0,0 +1,26 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Triage: a perception signal must report an incident with at least this
+# confidence for the incident to continue past the perception stage
+TRIAGE_CONFIDENCE_THRESHOLD = float(os.getenv("TRIAGE_CONFIDENCE_THRESHOLD", "0.5"))
+
+# Latency budget: end-to-end deadline (seconds) for one incident run. Once the
+# budget is spent, remaining LLM nodes fall back to a degraded path.
+LATENCY_BUDGET_SECONDS = float(os.getenv("LATENCY_BUDGET_SECONDS", "60"))
+
+
+def _parse_severity_budgets(value: str) -> dict:
+    """Parse "severity:seconds,..." (e.g. "4:20,5:15") into {severity: seconds}."""
+    budgets = {}
+    for item in value.split(","):
+        if item.strip():
+            severity, seconds = item.split(":")
+            budgets[int(severity)] = float(seconds)
+    return budgets
+
+
+# Tighter budgets applied once risk assessment has assigned a severity
+SEVERITY_LATENCY_BUDGETS = _parse_severity_budgets(os.getenv("SEVERITY_LATENCY_BUDGETS", "4:20,5:15"))
@@ -1,59 +1,89 @@
 import logging
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, END
 from state import IncidentState
 from agents.vision import vision_react_node
 from agents.speech import speech_react_node
 from agents.video import video_react_node
 from agents.memory_retrieval import memory_retrieval_node
+from agents.triage import triage_node, no_action_node, route_after_triage
 from agents.fusion import fusion_understanding_node
 from agents.risk import risk_node
 from agents.human import human_review_node
 from agents.planning import response_planning_node
-from agents.response_llm import response_llm_node
-from agents.voice import voice_execution_node
-from agents.email import email_execution_node
-from agents.call import call_execution_node
+from agents.response_llm import response_llm_node, templated_actions
+from agents.dispatch import dispatch_node
 from agents.escalation import escalation_node
 from agents.monitoring import monitoring_node
 from agents.explainability import explainability_node
 from agents.learning import learning_node
 from agents.self_reflection import self_reflection_node
 from config.logging_config import get_logger
+from checkpointer import get_checkpointer
+from metrics import instrument_node
+from budget import budget_node
 
 logger = get_logger(__name__)
 
+NODES = {
+    "memory": memory_retrieval_node,
+    "vision_agent": vision_react_node,
+    "speech_agent": speech_react_node,
+    "video_agent": video_react_node,
+    "triage": triage_node,
+    "no_action": no_action_node,
+    "fusion": fusion_understanding_node,
+    "risk": risk_node,
+    "human": human_review_node,
+    "planning": response_planning_node,
+    "respond": response_llm_node,
+    "dispatch": dispatch_node,
+    "escalate": escalation_node,
+    "monitor": monitoring_node,
+    "explain": explainability_node,
+    "self_reflect": self_reflection_node,
+    "learn": learning_node,
+}
+
+# Degraded-path updates for nodes bounded by the incident's latency budget.
+# Dispatch, escalation, monitoring and learning always run: dispatch has its own
+# per-channel deadlines, the others make no LLM calls.
+BUDGET_FALLBACKS = {
+    "memory": lambda s: {"long_term_context": None},
+    "vision_agent": lambda s: {"vision_signal": {}},
+    "speech_agent": lambda s: {"audio_signal": {}},
+    "video_agent": lambda s: {"video_signal": {}},
+    "fusion": lambda s: {"fused_incident": {}},
+    # No time for a human round-trip: act at a medium severity on the templated path
+    "risk": lambda s: {"severity": 3, "risk_score": 0.5, "requires_human": False},
+    "planning": lambda s: {"plan": []},
+    "respond": templated_actions,
+    "explain": lambda s: {},
+    "self_reflect": lambda s: {},
+}
+
 g = StateGraph(IncidentState)
-g.add_node("memory", memory_retrieval_node)
-g.add_node("vision_agent",vision_react_node)
-g.add_node("speech_agent",speech_react_node)
-g.add_node("video_agent",video_react_node)
-g.add_node("fusion", fusion_understanding_node)
-g.add_node("risk", risk_node)
-g.add_node("human", human_review_node)
-g.add_node("planning", response_planning_node)
-g.add_node("respond", response_llm_node)
-g.add_node("voice", voice_execution_node)
-g.add_node("email", email_execution_node)
-g.add_node("call", call_execution_node)
-g.add_node("escalate", escalation_node)
-g.add_node("monitor", monitoring_node)
-g.add_node("explain", explainability_node)
-g.add_node("self_reflect", self_reflection_node)
-g.add_node("learn", learning_node)
+# Every node is instrumented for latency, token and external-call metrics
+for name, node in NODES.items():
+    if name in BUDGET_FALLBACKS:
+        node = budget_node(name, node, BUDGET_FALLBACKS[name])
+    g.add_node(name, instrument_node(name, node))
 
 g.set_entry_point("memory")
-g.add_edge("memory", "vision_agent")
-g.add_edge("vision_agent","speech_agent")
-g.add_edge("speech_agent","video_agent")
-g.add_edge("video_agent","fusion")
+# Perception agents read disjoint observations, so fan them out in parallel
+# and join at triage once all three signals are in.
+PERCEPTION_NODES = ["vision_agent", "speech_agent", "video_agent"]
+for node in PERCEPTION_NODES:
+    g.add_edge("memory", node)
+g.add_edge(PERCEPTION_NODES, "triage")
+# Benign submissions skip the LLM-heavy tail entirely
+g.add_conditional_edges("triage", route_after_triage, {"fusion": "fusion", "no_action": "no_action"})
+g.add_edge("no_action", END)
 g.add_edge("fusion", "risk")
 g.add_conditional_edges("risk", lambda s: "human" if s["requires_human"] else "planning")
 g.add_edge("human", "planning")
 g.add_edge("planning", "respond")
-g.add_edge("respond", "voice")
-g.add_edge("voice", "email")
-g.add_edge("email", "call")
-g.add_edge("call", "escalate")
+g.add_edge("respond", "dispatch")
+g.add_edge("dispatch", "escalate")
 g.add_edge("escalate", "monitor")
 # g.add_conditional_edges("monitor", lambda s: "planning" if not s["resolved"] else "explain")
 g.add_edge("monitor","explain")
@@ -62,5 +92,6 @@ g.add_edge("self_reflect", "learn")
 
 g.set_finish_point("learn")
 
-incident_graph = g.compile()
+# Pause before human review; /human/{incident_id} resumes from the checkpoint
+incident_graph = g.compile(checkpointer=get_checkpointer(), interrupt_before=["human"])
 logger.info("Incident graph compiled successfully with all nodes and edges")
@@ -0,0 +1,124 @@
+"""
+In-process incident job queue.
+
+POST /incident enqueues a job and returns immediately; a bounded pool of
+asyncio workers runs the incident graph and records progress on the job so
+/incident/{incident_id}/status can report it.
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from dotenv import load_dotenv
+from config.logging_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+INCIDENT_WORKERS = int(os.getenv("INCIDENT_WORKERS", "4"))
+INCIDENT_QUEUE_SIZE = int(os.getenv("INCIDENT_QUEUE_SIZE", "100"))
+# Finished jobs kept in memory for status polling; older ones fall back to MongoDB
+INCIDENT_JOB_HISTORY = int(os.getenv("INCIDENT_JOB_HISTORY", "1000"))
+# POST /incidents/batch: graphs run concurrently per request, and requests are size-capped
+INCIDENT_BATCH_CONCURRENCY = int(os.getenv("INCIDENT_BATCH_CONCURRENCY", "8"))
+INCIDENT_BATCH_MAX_SIZE = int(os.getenv("INCIDENT_BATCH_MAX_SIZE", "500"))
+
+# Job lifecycle
+QUEUED = "queued"
+RUNNING = "running"
+AWAITING_HUMAN = "awaiting_human"
+COMPLETED = "completed"
+FAILED = "failed"
+
+FINISHED_STATUSES = (AWAITING_HUMAN, COMPLETED, FAILED)
+
+
+class IncidentJobQueue:
+    """Bounded asyncio worker pool over a FIFO of incident jobs.
+
+    A job is a plain dict (incident_id, store_id, payload, status, current_node, ...).
+    The processor receives the job and updates its progress fields in place.
+    """
+
+    def __init__(
+        self,
+        processor: Callable[[Dict], Awaitable[None]],
+        workers: int = INCIDENT_WORKERS,
+        maxsize: int = INCIDENT_QUEUE_SIZE,
+        history: int = INCIDENT_JOB_HISTORY,
+    ):
+        self.processor = processor
+        self.worker_count = workers
+        self.maxsize = maxsize
+        self.history = history
+        self.queue: Optional[asyncio.Queue] = None
+        self.jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._workers = []
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"incident-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"Incident job queue started with {self.worker_count} workers (capacity {self.maxsize})")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Incident job queue stopped")
+
+    def submit(self, incident_id: str, store_id: str, payload) -> Dict:
+        """Enqueue a job. Raises asyncio.QueueFull when the queue is at capacity."""
+        job = {
+            "incident_id": incident_id,
+            "store_id": store_id,
+            "payload": payload,
+            "status": QUEUED,
+            "current_node": None,
+            "completed_nodes": [],
+            "error": None,
+            "queued_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self.queue.put_nowait(job)
+        self.jobs[incident_id] = job
+        self._evict_finished()
+        return job
+
+    def get(self, incident_id: str) -> Optional[Dict]:
+        return self.jobs.get(incident_id)
+
+    def _evict_finished(self):
+        while len(self.jobs) > self.history:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest["status"] not in FINISHED_STATUSES:
+                break
+            del self.jobs[oldest_id]
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self.queue.get()
+            incident_id = job["incident_id"]
+            job["status"] = RUNNING
+            job["started_at"] = time.time()
+            logger.info(f"[INCIDENT-{incident_id}] Worker {worker_id} picked up job (queue depth: {self.queue.qsize()})")
+            try:
+                await self.processor(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[INCIDENT-{incident_id}] Job failed: {str(e)}", exc_info=True)
+                job["status"] = FAILED
+                job["error"] = str(e)
+            finally:
+                job["current_node"] = None
+                job["finished_at"] = time.time()
+                # The raw payload can hold large base64 media; drop it once processed
+                job.pop("payload", None)
+                self.queue.task_done()
@@ -0,0 +1,190 @@
+"""
+Per-node instrumentation for the incident graph.
+
+Every graph node is wrapped with instrument_node, which records wall time,
+LLM tokens, embedding calls and external service calls for that execution.
+Values are exported as Prometheus histograms (/metrics) and returned in the
+node's state update under "node_metrics" so each incident carries its own
+breakdown.
+"""
+import time
+import inspect
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+NODE_DURATION = Histogram(
+    "incident_node_duration_seconds",
+    "Wall time of a single incident graph node execution",
+    ["node"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+NODE_LLM_TOKENS = Histogram(
+    "incident_node_llm_tokens",
+    "LLM tokens used by a single node execution",
+    ["node", "kind"],
+    buckets=(0, 100, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+NODE_LLM_CALLS = Histogram(
+    "incident_node_llm_calls",
+    "LLM calls made by a single node execution",
+    ["node"],
+    buckets=COUNT_BUCKETS,
+)
+NODE_EMBEDDING_CALLS = Histogram(
+    "incident_node_embedding_calls",
+    "Embedding API calls made by a single node execution",
+    ["node"],
+    buckets=COUNT_BUCKETS,
+)
+NODE_EXTERNAL_CALLS = Histogram(
+    "incident_node_external_calls",
+    "External HTTP calls (Azure Vision/Speech, Twilio, SendGrid) made by a single node execution",
+    ["node"],
+    buckets=COUNT_BUCKETS,
+)
+RAG_CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups_total",
+    "RAGEngine cache lookups by cache and outcome",
+    ["cache", "outcome"],
+)
+
+
+class NodeMetrics:
+    """Counters for one node execution."""
+
+    def __init__(self):
+        self.duration_seconds = 0.0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.embedding_calls = 0
+        self.external_calls = {}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "duration_seconds": round(self.duration_seconds, 4),
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "embedding_calls": self.embedding_calls,
+            "external_calls": dict(self.external_calls),
+        }
+
+
+# Metrics of the node executing in the current task (None outside the graph).
+# asyncio tasks and asyncio.to_thread copy the context, so calls made from
+# gathered sub-tasks or worker threads are attributed to the calling node.
+_current_node_metrics: ContextVar[Optional[NodeMetrics]] = ContextVar("current_node_metrics", default=None)
+
+
+def record_llm_usage(prompt_tokens: int, completion_tokens: int):
+    metrics = _current_node_metrics.get()
+    if metrics is not None:
+        metrics.llm_calls += 1
+        metrics.prompt_tokens += prompt_tokens or 0
+        metrics.completion_tokens += completion_tokens or 0
+
+
+def record_embedding_call(count: int = 1):
+    metrics = _current_node_metrics.get()
+    if metrics is not None:
+        metrics.embedding_calls += count
+
+
+def record_external_call(service: str):
+    metrics = _current_node_metrics.get()
+    if metrics is not None:
+        metrics.external_calls[service] = metrics.external_calls.get(service, 0) + 1
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    RAG_CACHE_LOOKUPS.labels(cache=cache, outcome="hit" if hit else "miss").inc()
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LangChain callback that attributes LLM token usage to the current node."""
+
+    run_inline = True
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens = completion_tokens = 0
+        usage = None
+        try:
+            usage = response.generations[0][0].message.usage_metadata
+        except (IndexError, AttributeError):
+            pass
+        if usage:
+            prompt_tokens = usage.get("input_tokens", 0)
+            completion_tokens = usage.get("output_tokens", 0)
+        else:
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = token_usage.get("prompt_tokens", 0)
+            completion_tokens = token_usage.get("completion_tokens", 0)
+        record_llm_usage(prompt_tokens, completion_tokens)
+
+
+def _observe(name: str, metrics: NodeMetrics):
+    NODE_DURATION.labels(node=name).observe(metrics.duration_seconds)
+    NODE_LLM_TOKENS.labels(node=name, kind="prompt").observe(metrics.prompt_tokens)
+    NODE_LLM_TOKENS.labels(node=name, kind="completion").observe(metrics.completion_tokens)
+    NODE_LLM_CALLS.labels(node=name).observe(metrics.llm_calls)
+    NODE_EMBEDDING_CALLS.labels(node=name).observe(metrics.embedding_calls)
+    NODE_EXTERNAL_CALLS.labels(node=name).observe(sum(metrics.external_calls.values()))
+
+
+def instrument_node(name: str, node):
+    """Wrap a graph node so each execution is timed and its calls are counted."""
+    takes_config = "config" in inspect.signature(node).parameters
+
+    # No functools.wraps: LangGraph inspects the wrapper's own signature to pass config
+    async def instrumented(state, config: RunnableConfig):
+        metrics = NodeMetrics()
+        token = _current_node_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            result = await (node(state, config) if takes_config else node(state))
+        finally:
+            metrics.duration_seconds = time.perf_counter() - start
+            _current_node_metrics.reset(token)
+            _observe(name, metrics)
+
+        logger.debug(f"[INCIDENT-{state.get('incident_id', 'unknown')}] [METRICS] {name}: {metrics.as_dict()}")
+        return {**(result or {}), "node_metrics": {name: metrics.as_dict()}}
+
+    instrumented.__name__ = f"instrumented_{getattr(node, '__name__', name)}"
+    return instrumented
+
+
+def summarize_node_metrics(node_metrics: Optional[Dict[str, Dict]]) -> Dict[str, Any]:
+    """Per-incident totals plus the per-node breakdown, for the incident document."""
+    node_metrics = node_metrics or {}
+    totals = {
+        "node_seconds": 0.0,
+        "llm_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "embedding_calls": 0,
+        "external_calls": 0,
+    }
+    for metrics in node_metrics.values():
+        totals["node_seconds"] += metrics.get("duration_seconds", 0.0)
+        totals["llm_calls"] += metrics.get("llm_calls", 0)
+        totals["prompt_tokens"] += metrics.get("prompt_tokens", 0)
+        totals["completion_tokens"] += metrics.get("completion_tokens", 0)
+        totals["embedding_calls"] += metrics.get("embedding_calls", 0)
+        totals["external_calls"] += sum(metrics.get("external_calls", {}).values())
+    totals["node_seconds"] = round(totals["node_seconds"], 4)
+    return {"totals": totals, "nodes": node_metrics}
+
+
+def render_metrics():
+    """Prometheus exposition payload and content type for /metrics."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -43,6 +43,7 @@ class Incident(BaseModel):
     id: str = Field(alias="_id")
     store_id: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    status: str = "completed"  # queued, running, awaiting_human, completed, failed
     resolved: bool = False
     severity: Optional[int] = None
     risk_score: Optional[float] = None
@@ -0,0 +1,154 @@
+# rag/benchmark_quantization.py
+"""
+Measure what shortened embeddings and a quantized FAISS index cost in recall,
+and what they save in latency and memory, on the incident memories.
+
+For each embedding width (vectors truncated and re-normalized, which is what
+text-embedding-3 returns for a smaller "dimensions") and each FAISS_QUANTIZATION
+setting, the memories are loaded into a temporary FAISS collection and searched
+with held-out memories as queries. Reported per run:
+- recall@k against an exact float32 search at the full width
+- p50/p95 query latency, including the full-precision re-rank
+- size of the main index file (what each worker maps into memory)
+
+Memory vectors come from the embedding cache (memories are cached when they
+are learned), so a run normally makes no embedding calls. Without enough
+memories, use --synthetic N for clustered synthetic vectors instead.
+
+Run from app/:
+  python -m rag.benchmark_quantization --dims 3072 1024 256 --quantization none int8 binary
+"""
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from rag.config import MEMORY_COLLECTION, FAISS_INDEX_FACTORY
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+QUANTIZATIONS = ["none", "int8", "binary"]
+# Distinct incident "topics" in the synthetic data
+SYNTHETIC_CLUSTERS = 200
+
+
+def _normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def memory_vectors() -> np.ndarray:
+    """Full-width embeddings of every stored incident memory."""
+    from rag.vectorstore import create_vector_store
+    from rag.embeddings import embed_documents
+
+    store = create_vector_store(MEMORY_COLLECTION)
+    documents = [document for _, page, _ in store.iter_documents() for document in page]
+    logger.info(f"[RAG] Benchmarking on {len(documents)} memories from '{MEMORY_COLLECTION}'")
+    return np.asarray(embed_documents(documents), dtype="float32") if documents else np.empty((0, 0), "float32")
+
+
+def embedding_width() -> int:
+    """Width of the active embedding model's vectors (EMBEDDING_DIMENSIONS, or the model's own)."""
+    from rag.embeddings import embed_documents
+
+    # A single cached embedding: the width depends on the backend, model and EMBEDDING_DIMENSIONS
+    return len(embed_documents(["incident"])[0])
+
+
+def synthetic_vectors(size: int, dim: int) -> np.ndarray:
+    """Unit vectors around a few hundred centres, so near neighbours exist as they do among real incidents."""
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((SYNTHETIC_CLUSTERS, dim), dtype="float32")
+    vectors = centres[rng.integers(0, SYNTHETIC_CLUSTERS, size)]
+    vectors += 0.5 * rng.standard_normal((size, dim), dtype="float32")
+    return _normalize(vectors)
+
+
+def exact_neighbours(corpus, queries, k):
+    """Ground truth: row positions of each query's k nearest memories at full width."""
+    neighbours = []
+    for query in queries:
+        distances = ((corpus - query) ** 2).sum(axis=1)
+        neighbours.append(set(np.argsort(distances)[:k].tolist()))
+    return neighbours
+
+
+def run_one(corpus, queries, truth, dim, quantization, factory, rerank_factor, k) -> dict:
+    from rag.faiss_store import FaissVectorStore
+
+    # Shortened embeddings: the leading dimensions, re-normalized
+    corpus = _normalize(corpus[:, :dim])
+    queries = _normalize(queries[:, :dim])
+    path = tempfile.mkdtemp(prefix="bench-quantization-")
+    try:
+        store = FaissVectorStore(
+            "bench", index_dir=path, factory=factory, quantization=quantization, rerank_factor=rerank_factor
+        )
+        store.add_many(
+            embeddings=corpus.tolist(),
+            documents=[f"memory {i}" for i in range(len(corpus))],
+            metadatas=[{"position": i} for i in range(len(corpus))],
+            ids=[f"memory-{i}" for i in range(len(corpus))],
+        )
+        # Search the main index alone, as a steady-state deployment mostly does
+        store.compact()
+
+        timings, hits = [], 0
+        for query, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            results = store.search(query.tolist(), k)
+            timings.append((time.perf_counter() - t0) * 1000)
+            hits += len(expected & {r["metadata"]["position"] for r in results})
+
+        return {
+            "dim": dim,
+            "quantization": quantization,
+            "index": store.factory,
+            "rerank_factor": rerank_factor if quantization != "none" else None,
+            "documents": len(corpus),
+            f"recall@{k}": round(hits / (len(truth) * k), 4),
+            "p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p95_ms": round(float(np.percentile(timings, 95)), 3),
+            "index_mb": round(store.index_bytes() / 2 ** 20, 2),
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", type=int, nargs="+", help="embedding widths to compare (default: full width, 1024, 256)")
+    parser.add_argument("--quantization", nargs="+", default=QUANTIZATIONS, choices=QUANTIZATIONS)
+    parser.add_argument("--factory", default=FAISS_INDEX_FACTORY, help="index_factory string of the main index")
+    parser.add_argument("--rerank-factors", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--queries", type=int, default=200, help="memories held out as queries")
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--synthetic", type=int, metavar="N", help="use N synthetic vectors instead of the memories")
+    parser.add_argument("--synthetic-dim", type=int, help="width of the synthetic vectors (default: the embedding model's)")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.synthetic_dim or embedding_width())
+    else:
+        vectors = memory_vectors()
+    if len(vectors) < 2 * args.queries:
+        parser.error(f"{len(vectors)} memories is too few for {args.queries} queries; lower --queries or use --synthetic")
+
+    # The held-out queries are not in the index, as a new incident's lookup would not be
+    queries, corpus = vectors[:args.queries], vectors[args.queries:]
+    truth = exact_neighbours(corpus, queries, args.k)
+    full_dim = vectors.shape[1]
+    dims = [dim for dim in (args.dims or [full_dim, 1024, 256]) if dim <= full_dim]
+
+    for dim in dict.fromkeys(dims):
+        for quantization in args.quantization:
+            for rerank_factor in (args.rerank_factors if quantization != "none" else [1]):
+                print(json.dumps(run_one(
+                    corpus, queries, truth, dim, quantization, args.factory, rerank_factor, args.k
+                )))
+
+
+if __name__ == "__main__":
+    main()
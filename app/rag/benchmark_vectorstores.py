@@ -0,0 +1,170 @@
+# rag/benchmark_vectorstores.py
+"""
+Compare the vector store backends on synthetic data: build time, query latency
+(p50/p95, top-k with and without a store_id filter) and resident memory.
+
+FAISS runs also reopen the compacted main index and search it again; this must
+not add private memory in proportion to the index size, since the index is
+mapped from its file rather than copied into the process. A run where it does
+fails (an index type FAISS cannot map, or an mmap regression).
+
+Each backend/size pair runs in its own subprocess so RSS figures do not leak
+between runs; backends whose packages are missing are reported and skipped.
+Indexes are written under a temporary directory, never app/chroma_db or
+app/faiss_index.
+
+Run from app/:
+  python -m rag.benchmark_vectorstores --sizes 10000 100000 1000000 --dim 3072
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+BACKENDS = ["chroma", "faiss-flat", "faiss-hnsw", "faiss-ivf"]
+FAISS_FACTORIES = {"faiss-flat": "Flat", "faiss-hnsw": "HNSW32", "faiss-ivf": "IVF{nlist},Flat"}
+ADD_BATCH = 5000
+STORES = 20
+# Reopening a mapped index may add at most this share of its size as private memory
+MAPPED_PRIVATE_MAX_FRACTION = 0.25
+# Below this size allocator noise outweighs the index, so the check is skipped
+MAPPED_CHECK_MIN_MB = 16
+
+
+def _rss_mb(field: str = "VmRSS") -> float:
+    """Resident memory from /proc/self/status: VmRSS in total, RssAnon for private pages only."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _open_store(backend: str, size: int, path: str):
+    # Backend modules are imported here so a missing package only fails that run
+    if backend == "chroma":
+        import chromadb
+        client = chromadb.PersistentClient(path=path)
+        return ChromaBench(client.get_or_create_collection("bench"))
+    from rag.faiss_store import FaissVectorStore
+    factory = FAISS_FACTORIES[backend].format(nlist=max(1, int(4 * size ** 0.5)))
+    return FaissVectorStore("bench", index_dir=path, factory=factory)
+
+
+class ChromaBench:
+    """Chroma collection behind the add_many/search calls used below."""
+    def __init__(self, collection):
+        self.collection = collection
+
+    def add_many(self, embeddings, documents, metadatas, ids):
+        self.collection.add(embeddings=embeddings, documents=documents, metadatas=metadatas, ids=ids)
+
+    def compact(self):
+        pass
+
+    def search(self, embedding, k, where=None):
+        return self.collection.query(query_embeddings=[embedding], n_results=k, where=where)
+
+
+def run_one(backend: str, size: int, dim: int, queries: int, k: int) -> dict:
+    rng = np.random.default_rng(0)
+    path = tempfile.mkdtemp(prefix=f"bench-{backend}-")
+    try:
+        rss_before = _rss_mb()
+        store = _open_store(backend, size, path)
+
+        started = time.perf_counter()
+        for start in range(0, size, ADD_BATCH):
+            count = min(ADD_BATCH, size - start)
+            vectors = rng.standard_normal((count, dim), dtype="float32")
+            store.add_many(
+                embeddings=vectors.tolist(),
+                documents=[f"document {start + i}" for i in range(count)],
+                metadatas=[{"store_id": f"store-{(start + i) % STORES}"} for i in range(count)],
+                ids=[f"doc-{start + i}" for i in range(count)],
+            )
+        # FAISS: fold the delta into the main index, as a steady-state deployment would have
+        store.compact()
+        build_seconds = time.perf_counter() - started
+
+        query_vectors = rng.standard_normal((queries, dim), dtype="float32").tolist()
+        latencies = {}
+        for label, where in (("unfiltered", None), ("filtered", {"store_id": {"$eq": "store-0"}})):
+            timings = []
+            for vector in query_vectors:
+                t0 = time.perf_counter()
+                store.search(vector, k, where)
+                timings.append((time.perf_counter() - t0) * 1000)
+            latencies[label] = {
+                "p50_ms": round(float(np.percentile(timings, 50)), 3),
+                "p95_ms": round(float(np.percentile(timings, 95)), 3),
+            }
+
+        result = {
+            "backend": backend,
+            "size": size,
+            "dim": dim,
+            "build_seconds": round(build_seconds, 2),
+            "query": latencies,
+            "rss_mb": round(_rss_mb() - rss_before, 1),
+        }
+        if backend != "chroma":
+            result.update(_check_mapped_index(store, backend, size, path, query_vectors, k))
+        return result
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _check_mapped_index(store, backend: str, size: int, path: str, query_vectors, k: int) -> dict:
+    """Reopen the main index and search it; assert it added little private memory for its size."""
+    index_mb = store.index_bytes() / 2 ** 20
+    private_before = _rss_mb("RssAnon")
+    reopened = _open_store(backend, size, path)
+    for vector in query_vectors:
+        reopened.search(vector, k)
+    private_mb = _rss_mb("RssAnon") - private_before
+    if index_mb >= MAPPED_CHECK_MIN_MB:
+        assert private_mb <= MAPPED_PRIVATE_MAX_FRACTION * index_mb, (
+            f"reopening the {index_mb:.0f} MB main index added {private_mb:.0f} MB of private memory: it was not mapped"
+        )
+    return {"index_mb": round(index_mb, 1), "reopen_private_mb": round(private_mb, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_one(args.backends[0], args.sizes[0], args.dim, args.queries, args.k)))
+        return
+
+    for size in args.sizes:
+        for backend in args.backends:
+            cmd = [
+                sys.executable, "-m", "rag.benchmark_vectorstores", "--child",
+                "--backends", backend, "--sizes", str(size),
+                "--dim", str(args.dim), "--queries", str(args.queries), "--k", str(args.k),
+            ]
+            # Load everything into the delta and build the main index once, at the end
+            env = {**os.environ, "FAISS_DELTA_MAX": str(size + 1)}
+            proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+            if proc.returncode != 0:
+                error = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+                print(json.dumps({"backend": backend, "size": size, "skipped": error}))
+                continue
+            print(proc.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
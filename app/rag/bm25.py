@@ -0,0 +1,91 @@
+# rag/bm25.py
+"""
+In-memory BM25 index over the policy chunks, for the exact tokens dense
+search tends to miss ("Level 4", "weapons", "gas", section numbers like "3.2").
+"""
+import re
+import math
+from collections import Counter
+
+# Section numbers stay whole ("3.2"), everything else splits into words and numbers
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)+|[a-z0-9]+")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def rrf_relevance(result: dict) -> float:
+    """Ranking key for results fused by reciprocal_rank_fusion (or ranked by the keyword index alone)."""
+    return result.get("rrf_score", 0.0)
+
+
+def reciprocal_rank_fusion(rankings: list, k: int, rrf_k: int) -> list:
+    """
+    Merge ranked result lists by id: each list adds 1 / (rrf_k + rank) to a
+    result's score. Returns the top k, best first, with "rrf_score" set.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            entry = fused.setdefault(result["id"], {**result, "rrf_score": 0.0})
+            # Keep the vector distance when the other list saw the document first
+            if entry.get("distance") is None and result.get("distance") is not None:
+                entry["distance"] = result["distance"]
+            entry["rrf_score"] += 1 / (rrf_k + rank)
+    return sorted(fused.values(), key=rrf_relevance, reverse=True)[:k]
+
+
+class BM25Index:
+    def __init__(self, documents: list):
+        """documents: dicts with id, text and metadata (the policy loader's chunk records)."""
+        self.documents = documents
+        self.term_freqs = [Counter(tokenize(doc["text"])) for doc in documents]
+        self.lengths = [sum(freqs.values()) for freqs in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if documents else 0.0
+        self.doc_freqs = Counter(term for freqs in self.term_freqs for term in freqs)
+        # term -> positions of the documents containing it
+        self.postings = {}
+        for position, freqs in enumerate(self.term_freqs):
+            for term in freqs:
+                self.postings.setdefault(term, []).append(position)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def covers(self, query: str, max_terms: int) -> bool:
+        """
+        True for short keyword queries whose every term occurs in the corpus;
+        those are answered from this index alone, without an embedding.
+        """
+        terms = tokenize(query)
+        return 0 < len(terms) <= max_terms and all(term in self.doc_freqs for term in terms)
+
+    def _idf(self, term: str) -> float:
+        n = self.doc_freqs[term]
+        return math.log(1 + (len(self.documents) - n + 0.5) / (n + 0.5))
+
+    def search(self, query: str, k: int) -> list:
+        scores = Counter()
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            idf = self._idf(term)
+            for position in self.postings[term]:
+                tf = self.term_freqs[position][term]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / self.avg_length)
+                scores[position] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        return [
+            {
+                "id": self.documents[position]["id"],
+                "text": self.documents[position]["text"],
+                "metadata": self.documents[position]["metadata"],
+                "distance": None,
+                "bm25_score": score,
+            }
+            for position, score in scores.most_common(k)
+        ]
@@ -1,9 +1,16 @@
+import re
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from rag.config import CHUNK_SIZE, CHUNK_OVERLAP
+
+# Top-level policy sections ("4. CUSTOMER BEHAVIOR & CONFLICT ..."). Chunks never
+# span two sections, so editing one section leaves every other section's chunks
+# (and their content-addressed ids) unchanged on re-ingestion.
+SECTION_PATTERN = re.compile(r"^(?=\d+\.\s+[A-Z])", re.MULTILINE)
 
 def chunk_policy_text(text: str):
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,          # ideal for policies
-        chunk_overlap=150,       # preserves thresholds/context
+        chunk_size=CHUNK_SIZE,   # ideal for policies
+        chunk_overlap=CHUNK_OVERLAP,  # preserves thresholds/context
         separators=[
             "\n\n",              # section breaks
             "\n",                # paragraphs
@@ -13,4 +20,9 @@ def chunk_policy_text(text: str):
         ]
     )
 
-    return splitter.split_text(text)
+    return [
+        chunk
+        for section in SECTION_PATTERN.split(text)
+        if section.strip()
+        for chunk in splitter.split_text(section)
+    ]
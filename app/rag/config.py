@@ -1,7 +1,137 @@
 # rag/config.py
 
+import os
+import re
+from dotenv import load_dotenv
 
-EMBEDDING_MODEL = "text-embedding-3-large"
+load_dotenv()
+
+# Embedding backend: "azure" (Azure OpenAI, default) or "local" (sentence-transformers on CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "azure")
+AZURE_EMBEDDING_MODEL = "text-embedding-3-large"
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Local inference runtime: "torch", "torch-int8" (dynamically quantized linear layers) or "onnx"
+LOCAL_EMBEDDING_RUNTIME = os.getenv("LOCAL_EMBEDDING_RUNTIME", "torch")
+# ONNX file inside the model repo, e.g. "onnx/model_qint8_avx512.onnx" for the int8 export (Optional)
+LOCAL_EMBEDDING_ONNX_FILE = os.getenv("LOCAL_EMBEDDING_ONNX_FILE")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+# Shortened embeddings, e.g. 1024 or 256: text-embedding-3 models return them natively
+# (the "dimensions" request parameter), local models are truncated and re-normalized,
+# which suits Matryoshka-trained models. Unset keeps the model's full width (Optional)
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or 0) or None
+
+# Model whose vectors are stored: names the embedding cache entries and the collections.
+# A shortened width is part of the name, so full and shortened vectors never mix.
+EMBEDDING_MODEL = LOCAL_EMBEDDING_MODEL if EMBEDDING_BACKEND == "local" else AZURE_EMBEDDING_MODEL
+if EMBEDDING_DIMENSIONS:
+    EMBEDDING_MODEL = f"{EMBEDDING_MODEL}-{EMBEDDING_DIMENSIONS}d"
 
-VECTOR_DIM = 3072
 TOP_K = 4
+
+# Vector store backend: "chroma" (default) or "faiss"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# FAISS backend: one directory per collection holding the index and its metadata sidecar
+FAISS_INDEX_DIR = os.getenv(
+    "FAISS_INDEX_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "faiss_index")),
+)
+# faiss.index_factory description of the main index, e.g. "Flat", "HNSW32", "IVF1024,Flat"
+FAISS_INDEX_FACTORY = os.getenv("FAISS_INDEX_FACTORY", "HNSW32")
+# New vectors are searched from an in-memory flat delta until it reaches this size,
+# then the main index is rebuilt
+FAISS_DELTA_MAX = int(os.getenv("FAISS_DELTA_MAX", "5000"))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+# Filtered queries matching at most this many documents are answered by an exact scan
+FAISS_EXACT_FILTER_MAX = int(os.getenv("FAISS_EXACT_FILTER_MAX", "20000"))
+# Quantized main index: "none" (default), "int8" (scalar quantizer, 4x smaller than float32)
+# or "binary" (sign bits searched by Hamming distance, 32x smaller). Quantized candidates
+# are re-ranked with the full-precision vectors kept in the sidecar.
+FAISS_QUANTIZATION = os.getenv("FAISS_QUANTIZATION", "none")
+# Candidates taken from a quantized index per requested result, before the re-rank
+FAISS_RERANK_FACTOR = int(os.getenv("FAISS_RERANK_FACTOR", "4"))
+
+# Collections: SOP chunks and learned incident memories are kept apart so policy
+# lookups don't scan incident history
+def _model_collection(name: str) -> str:
+    """
+    Collection name for the active embedding model, so vectors of different
+    models (and dimensions) never share a collection. The Azure model keeps the
+    plain names used before other models were supported.
+    """
+    if EMBEDDING_MODEL == AZURE_EMBEDDING_MODEL:
+        return name
+    model_slug = re.sub(r"[^a-z0-9]+", "-", EMBEDDING_MODEL.split("/")[-1].lower()).strip("-")
+    # Chroma names are at most 63 characters and must end alphanumeric
+    return f"{name}-{model_slug}"[:63].rstrip("-_.")
+
+POLICY_COLLECTION = _model_collection(os.getenv("POLICY_COLLECTION", "store_policies"))
+MEMORY_COLLECTION = _model_collection(os.getenv("MEMORY_COLLECTION", "incident_memories"))
+# RAGEngine namespaces backed by those collections
+POLICY = "policy"
+MEMORY = "memory"
+# Single collection used before the split (read by rag.migrate_collections)
+LEGACY_COLLECTION = "incidents_and_policies"
+
+# Memory compaction: memories whose memory_decay.decay_score drops below the
+# threshold are evicted; the job runs every interval (0 disables it)
+MEMORY_EVICTION_THRESHOLD = float(os.getenv("MEMORY_EVICTION_THRESHOLD", "0.05"))
+MEMORY_COMPACTION_INTERVAL_SECONDS = int(os.getenv("MEMORY_COMPACTION_INTERVAL_SECONDS", "86400"))
+
+# Memory consolidation (after each compaction pass): memories older than the minimum age
+# are clustered per store and incident type by embedding similarity to the cluster
+# centroid, and clusters of at least MEMORY_CONSOLIDATION_MIN_CLUSTER memories are
+# replaced by one summary memory (0 disables it)
+MEMORY_CONSOLIDATION_SIMILARITY = float(os.getenv("MEMORY_CONSOLIDATION_SIMILARITY", "0.9"))
+MEMORY_CONSOLIDATION_MIN_CLUSTER = int(os.getenv("MEMORY_CONSOLIDATION_MIN_CLUSTER", "3"))
+MEMORY_CONSOLIDATION_MIN_AGE_DAYS = float(os.getenv("MEMORY_CONSOLIDATION_MIN_AGE_DAYS", "7"))
+
+# One JSON line per policy ingestion: version, file hash and chunk counts
+POLICY_INGESTION_LOG_PATH = os.getenv(
+    "POLICY_INGESTION_LOG_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "policy_ingestions.jsonl")),
+)
+
+# Policy chunking (characters)
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
+
+# Persistent embedding cache (model + SHA-256 of the text -> vector)
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "embedding_cache", "embeddings.sqlite3")),
+)
+
+# Embedding request limits (Azure OpenAI: 2048 inputs and 300k tokens per request)
+EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", "2048"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "300000"))
+
+# RAGEngine in-memory caches: query embeddings and retrieval results (LRU + TTL)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "256"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "300"))
+# Semantic cache of packed contexts (LRU): a query whose embedding has at least this
+# cosine similarity to a cached query with the same namespace, filter and budget gets
+# that query's context without a vector search. 0 entries disables it.
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.98"))
+
+# Context packing: candidates fetched per requested chunk (headroom for dedupe),
+# and the token budget of the retrieved context each node puts in its prompt
+CONTEXT_CANDIDATE_FACTOR = int(os.getenv("CONTEXT_CANDIDATE_FACTOR", "2"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+NODE_CONTEXT_TOKENS = {
+    "memory": 1000,
+    "risk": 1200,
+    "planning": 1500,
+    "explain": 1000,
+    "self_reflect": 800,
+}
+
+# Hybrid policy retrieval: BM25 over the policy chunks fused with vector results by
+# reciprocal rank fusion; queries of at most HYBRID_KEYWORD_MAX_TERMS terms that all
+# occur in the policy are answered by BM25 alone, with no embedding call
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_KEYWORD_MAX_TERMS = int(os.getenv("HYBRID_KEYWORD_MAX_TERMS", "3"))
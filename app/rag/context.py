@@ -0,0 +1,82 @@
+# rag/context.py
+
+from rag.config import CHUNK_OVERLAP
+from rag.tokens import count_tokens
+from agents.memory_decay import decay_score
+
+# Shortest shared run of characters treated as chunker overlap rather than coincidence
+MIN_OVERLAP = 20
+# The splitter may cut slightly past the configured overlap at a separator
+MAX_OVERLAP = CHUNK_OVERLAP * 2
+
+
+def _overlap(tail_of: str, head_of: str) -> int:
+    """Length of the longest suffix of tail_of that is also a prefix of head_of."""
+    for length in range(min(len(tail_of), len(head_of), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if tail_of.endswith(head_of[:length]):
+            return length
+    return 0
+
+
+def _dedupe(text: str, selected: list) -> str:
+    """Strip the parts of text already covered by selected chunks ("" if fully covered)."""
+    for other in selected:
+        if text in other:
+            return ""
+        # Adjacent chunks from the splitter share up to CHUNK_OVERLAP characters
+        head = _overlap(other, text)
+        if head:
+            text = text[head:]
+        tail = _overlap(text, other)
+        if tail:
+            text = text[:-tail]
+        if (head or tail) and len(text.strip()) < MIN_OVERLAP:
+            # Only a sliver left once the overlap is removed
+            return ""
+    return text.strip()
+
+
+def _by_distance(result: dict) -> float:
+    return result.get("distance") if result.get("distance") is not None else float("inf")
+
+
+def decayed_relevance(result: dict) -> float:
+    """
+    Similarity scaled by memory_decay.decay_score, so recent and severe incidents
+    outrank stale ones at a similar distance. Memories without a timestamp
+    (written before timestamps were recorded) keep their plain similarity.
+    """
+    similarity = 1 / (1 + _by_distance(result))
+    metadata = result.get("metadata") or {}
+    if metadata.get("timestamp") is None:
+        return similarity
+    return similarity * decay_score(metadata["timestamp"], metadata.get("severity") or 0)
+
+
+def pack_context(results: list, top_k: int, max_tokens: int, relevance=None) -> list:
+    """
+    Choose the chunks that go into a prompt: closest first (or highest
+    relevance(result) when given), overlapping or duplicate text removed, at
+    most top_k chunks within max_tokens.
+
+    Returns the packed results (copies with the deduplicated text).
+    """
+    if relevance is None:
+        ranked = sorted(results, key=_by_distance)
+    else:
+        ranked = sorted(results, key=relevance, reverse=True)
+    packed, texts, used_tokens = [], [], 0
+    for result in ranked:
+        if len(packed) >= top_k:
+            break
+        text = _dedupe(result.get("text") or "", texts)
+        if not text:
+            continue
+        tokens = count_tokens(text)
+        if used_tokens + tokens > max_tokens:
+            # A smaller, lower-ranked chunk may still fit
+            continue
+        packed.append({**result, "text": text, "tokens": tokens})
+        texts.append(text)
+        used_tokens += tokens
+    return packed
@@ -0,0 +1,59 @@
+# rag/dedupe_collections.py
+"""
+One-off cleanup of duplicate documents left by the old per-process ids.
+
+Document ids used to default to str(hash(document)), which Python randomizes
+per process, so every restart stored the same texts again under new ids. This
+keeps one document per distinct text in each collection and deletes the rest.
+It keeps the copy whose id is already the content-hash id, else the newest by
+timestamp, else the first found.
+
+Run from app/:  python -m rag.dedupe_collections [--dry-run] [collection ...]
+(defaults to the policy and memory collections)
+"""
+import sys
+from rag.vectorstore import create_vector_store, content_id
+from rag.embedding_cache import content_hash
+from rag.config import POLICY_COLLECTION, MEMORY_COLLECTION
+from config.logging_config import setup_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+def _preference(doc_id: str, document: str, metadata: dict):
+    # The content-addressed id wins, then the newest
+    return (doc_id == content_id(document), (metadata or {}).get("timestamp") or 0)
+
+
+def dedupe_collection(store, dry_run: bool = False) -> int:
+    """Delete all but one document per distinct text; returns how many were (or would be) deleted."""
+    keep = {}
+    duplicates = []
+    for ids, documents, metadatas in store.iter_documents():
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            text_hash = content_hash(document or "")
+            candidate = (_preference(doc_id, document or "", metadata), doc_id)
+            if text_hash not in keep:
+                keep[text_hash] = candidate
+            elif candidate[0] > keep[text_hash][0]:
+                duplicates.append(keep[text_hash][1])
+                keep[text_hash] = candidate
+            else:
+                duplicates.append(doc_id)
+
+    if duplicates and not dry_run:
+        store.delete(duplicates)
+        store.compact()
+    logger.info(
+        f"[RAG] '{store.collection_name}': {len(keep)} distinct documents, "
+        f"{len(duplicates)} duplicates {'found' if dry_run else 'deleted'}"
+    )
+    return len(duplicates)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    args = sys.argv[1:]
+    dry_run = "--dry-run" in args
+    for name in [arg for arg in args if arg != "--dry-run"] or [POLICY_COLLECTION, MEMORY_COLLECTION]:
+        dedupe_collection(create_vector_store(name), dry_run=dry_run)
@@ -0,0 +1,71 @@
+# rag/embedding_cache.py
+
+import os
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the text, the content address of a chunk."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by embedding model + SHA-256 of the text.
+
+    Backed by a single SQLite file so it survives restarts and is shared by every
+    worker process on the host. Vectors are stored as float32, the precision
+    Chroma keeps them at anyway.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+            self._conn.commit()
+        logger.info(f"[RAG] Embedding cache at {path}")
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """Cached vectors for the given texts, keyed by text (misses are absent)."""
+        by_hash = {content_hash(text): text for text in texts}
+        found = {}
+        hashes = list(by_hash)
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[by_hash[text_hash]] = array("f", blob).tolist()
+        return found
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text]).get(text)
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """Store vectors keyed by text."""
+        rows = [(model, content_hash(text), array("f", vector).tobytes()) for text, vector in items.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def put(self, model: str, text: str, vector: List[float]):
+        self.put_many(model, {text: vector})
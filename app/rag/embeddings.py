@@ -1,31 +1,206 @@
 # rag/embeddings.py
 
 import os
-from openai import AzureOpenAI
+import asyncio
+import threading
+from functools import lru_cache
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from dotenv import load_dotenv
+from metrics import record_embedding_call
+from rag.config import (
+    EMBEDDING_CACHE_PATH, EMBEDDING_BATCH_MAX_ITEMS, EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_BACKEND, EMBEDDING_MODEL, AZURE_EMBEDDING_MODEL, LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_RUNTIME,
+    LOCAL_EMBEDDING_ONNX_FILE, LOCAL_EMBEDDING_BATCH_SIZE, EMBEDDING_DIMENSIONS,
+)
+from rag.embedding_cache import EmbeddingCache
+from rag.tokens import count_tokens
+from config.logging_config import get_logger
 load_dotenv()
 
-EMBEDDING_DEPLOYMENT_NAME = "text-embedding-3-large"
+logger = get_logger(__name__)
+
+EMBEDDING_DEPLOYMENT_NAME = AZURE_EMBEDDING_MODEL
 
 AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_VERSION = "2023-05-15"
+# The "dimensions" parameter needs API version 2024-02-01 or later
+AZURE_OPENAI_API_VERSION = os.getenv(
+    "AZURE_OPENAI_EMBEDDING_API_VERSION", "2024-02-01" if EMBEDDING_DIMENSIONS else "2023-05-15"
+)
+# Extra embeddings.create() arguments: the shortened width, when configured
+EMBEDDING_REQUEST_OPTIONS = {"dimensions": EMBEDDING_DIMENSIONS} if EMBEDDING_DIMENSIONS else {}
 
-if not AZURE_OPENAI_KEY or not AZURE_OPENAI_ENDPOINT:
-    raise RuntimeError("Azure OpenAI environment variables not set")
+# Only the azure backend needs credentials; without them the clients stay unset
+# and the first Azure embedding call fails instead of the import.
+client = None
+async_client = None
+if AZURE_OPENAI_KEY and AZURE_OPENAI_ENDPOINT:
+    client = AzureOpenAI(
+        api_key=AZURE_OPENAI_KEY,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_version=AZURE_OPENAI_API_VERSION,
+    )
 
-client = AzureOpenAI(
-    api_key=AZURE_OPENAI_KEY,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_version=AZURE_OPENAI_API_VERSION,
-)
+    async_client = AsyncAzureOpenAI(
+        api_key=AZURE_OPENAI_KEY,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_version=AZURE_OPENAI_API_VERSION,
+    )
+elif EMBEDDING_BACKEND == "azure":
+    logger.warning("[RAG] Azure OpenAI environment variables not set; embedding requests will fail")
+
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+
+def _require_azure():
+    if client is None:
+        raise RuntimeError("Azure OpenAI environment variables not set")
+
+@lru_cache(maxsize=1)
+def _local_model():
+    """Load the sentence-transformers model once, on first use."""
+    # Imported lazily: only the local backend needs sentence-transformers (and torch)
+    from sentence_transformers import SentenceTransformer
+
+    if LOCAL_EMBEDDING_RUNTIME == "onnx":
+        model_kwargs = {"file_name": LOCAL_EMBEDDING_ONNX_FILE} if LOCAL_EMBEDDING_ONNX_FILE else None
+        model = SentenceTransformer(
+            LOCAL_EMBEDDING_MODEL, device="cpu", backend="onnx", model_kwargs=model_kwargs,
+            truncate_dim=EMBEDDING_DIMENSIONS,
+        )
+    else:
+        model = SentenceTransformer(LOCAL_EMBEDDING_MODEL, device="cpu", truncate_dim=EMBEDDING_DIMENSIONS)
+        if LOCAL_EMBEDDING_RUNTIME == "torch-int8":
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    logger.info(f"[RAG] Local embedding model {EMBEDDING_MODEL} loaded ({LOCAL_EMBEDDING_RUNTIME})")
+    return model
+
+# One encode at a time: concurrent calls would only contend for the same CPU cores
+_local_lock = threading.Lock()
+
+def _local_embed(texts: list[str]) -> list[list[float]]:
+    """
+    Batched CPU inference; vectors are unit length, like text-embedding-3's
+    (a truncated model is normalized after truncation).
+    """
+    model = _local_model()
+    # Counted per encode, as an Azure request is; asyncio.to_thread carries the node's metrics context
+    record_embedding_call()
+    with _local_lock:
+        vectors = model.encode(
+            texts, batch_size=LOCAL_EMBEDDING_BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True
+        )
+    return vectors.tolist()
 
 def embed_text(text: str) -> list[float]:
     """
-    Generate embedding vector using Azure OpenAI embedding deployment.
+    Generate embedding vector using Azure OpenAI embedding deployment
+    (or the local model when EMBEDDING_BACKEND=local).
     """
+    if EMBEDDING_BACKEND == "local":
+        return _local_embed([text])[0]
+    _require_azure()
+    record_embedding_call()
     response = client.embeddings.create(
         model=EMBEDDING_DEPLOYMENT_NAME, 
-        input=text
+        input=text,
+        **EMBEDDING_REQUEST_OPTIONS
+    )
+    return response.data[0].embedding
+
+async def aembed_text(text: str) -> list[float]:
+    """
+    Async variant of embed_text for use inside the incident graph.
+    """
+    if EMBEDDING_BACKEND == "local":
+        return (await asyncio.to_thread(_local_embed, [text]))[0]
+    _require_azure()
+    record_embedding_call()
+    response = await async_client.embeddings.create(
+        model=EMBEDDING_DEPLOYMENT_NAME,
+        input=text,
+        **EMBEDDING_REQUEST_OPTIONS
     )
     return response.data[0].embedding
+
+def _batches(texts: list[str]) -> list[list[int]]:
+    """
+    Group input positions into requests that respect the provider's
+    per-request item and token limits, preserving input order.
+    """
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (len(current) >= EMBEDDING_BATCH_MAX_ITEMS or current_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """
+    Embed many texts in as few requests as the provider limits allow.
+    Returns one vector per input, in input order.
+    """
+    if EMBEDDING_BACKEND == "local":
+        return _local_embed(texts) if texts else []
+    _require_azure()
+    vectors = [None] * len(texts)
+    for batch in _batches(texts):
+        record_embedding_call()
+        response = client.embeddings.create(
+            model=EMBEDDING_DEPLOYMENT_NAME,
+            input=[texts[i] for i in batch],
+            **EMBEDDING_REQUEST_OPTIONS
+        )
+        for item in response.data:
+            vectors[batch[item.index]] = item.embedding
+    return vectors
+
+async def aembed_texts(texts: list[str]) -> list[list[float]]:
+    """
+    Async variant of embed_texts.
+    """
+    if EMBEDDING_BACKEND == "local":
+        return await asyncio.to_thread(_local_embed, texts) if texts else []
+    _require_azure()
+    vectors = [None] * len(texts)
+    for batch in _batches(texts):
+        record_embedding_call()
+        response = await async_client.embeddings.create(
+            model=EMBEDDING_DEPLOYMENT_NAME,
+            input=[texts[i] for i in batch],
+            **EMBEDDING_REQUEST_OPTIONS
+        )
+        for item in response.data:
+            vectors[batch[item.index]] = item.embedding
+    return vectors
+
+def embed_documents(texts: list[str]) -> list[list[float]]:
+    """
+    Embeddings for stored documents (policy chunks, incident memories), served
+    from the persistent cache when this model has embedded the text before.
+    Only cache misses are sent to the provider, batched.
+    """
+    vectors = embedding_cache.get_many(EMBEDDING_MODEL, texts)
+    missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+    if missing:
+        new_vectors = dict(zip(missing, embed_texts(missing)))
+        embedding_cache.put_many(EMBEDDING_MODEL, new_vectors)
+        vectors.update(new_vectors)
+    return [vectors[text] for text in texts]
+
+async def aembed_documents(texts: list[str]) -> list[list[float]]:
+    """
+    Async variant of embed_documents.
+    """
+    vectors = await asyncio.to_thread(embedding_cache.get_many, EMBEDDING_MODEL, texts)
+    missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+    if missing:
+        new_vectors = dict(zip(missing, await aembed_texts(missing)))
+        await asyncio.to_thread(embedding_cache.put_many, EMBEDDING_MODEL, new_vectors)
+        vectors.update(new_vectors)
+    return [vectors[text] for text in texts]
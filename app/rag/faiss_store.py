@@ -0,0 +1,476 @@
+# rag/faiss_store.py
+"""
+FAISS vector store backend.
+
+Each collection is a directory under FAISS_INDEX_DIR holding:
+- index.faiss: the main index (FAISS_INDEX_FACTORY wrapped in IDMap2). It is
+  rebuilt by compact(), written atomically and memory-mapped in place
+  (IO_FLAG_MMAP_IFC): its vectors and graph stay file-backed pages, which
+  worker processes on a host share through the page cache. Index types FAISS
+  cannot map are read into each process's memory instead.
+- meta.sqlite3: the sidecar, one row per document: FAISS id, document id, text,
+  metadata (JSON), vector, and whether the row is in the main index yet.
+
+New documents are written to the sidecar and searched from a small in-memory
+flat "delta" index until FAISS_DELTA_MAX rows accumulate; compact() then
+rebuilds the main index from the sidecar. Other processes pick up new rows and
+a replaced index file on their next search.
+
+With FAISS_QUANTIZATION the main index holds int8 codes (the factory's storage
+becomes SQ8) or sign bits (a flat Hamming index) instead of float32 vectors.
+It then only proposes candidates: k * FAISS_RERANK_FACTOR of them are re-ranked
+by exact distance to the sidecar's full-precision vectors.
+"""
+import os
+import json
+import fcntl
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+import faiss
+from rag.vectorstore import BaseVectorStore
+from rag.config import (
+    FAISS_INDEX_DIR, FAISS_INDEX_FACTORY, FAISS_DELTA_MAX,
+    FAISS_NPROBE, FAISS_EF_SEARCH, FAISS_EXACT_FILTER_MAX, FAISS_QUANTIZATION, FAISS_RERANK_FACTOR,
+)
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Rows per batch when streaming vectors out of the sidecar
+READ_BATCH = 50000
+# Stay under SQLite's bound-parameter limit
+SQL_IN_BATCH = 500
+# Memory for the rows matched by recent filters (memory lookups repeat the same store/type filter)
+FILTER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+_SQL_OPS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _where_sql(where: dict):
+    """Translate a Chroma-style metadata filter into a SQL condition on the sidecar."""
+    if "$and" in where or "$or" in where:
+        op = "$and" if "$and" in where else "$or"
+        parts = [_where_sql(clause) for clause in where[op]]
+        sql = f" {'AND' if op == '$and' else 'OR'} ".join(f"({part_sql})" for part_sql, _ in parts)
+        return sql, [param for _, part_params in parts for param in part_params]
+
+    clauses, params = [], []
+    for key, condition in where.items():
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, value in condition.items():
+            field = "json_extract(metadata, ?)"
+            params.append(f'$."{key}"')
+            if op in ("$in", "$nin"):
+                placeholders = ",".join("?" * len(value))
+                clauses.append(f"{field} {'IN' if op == '$in' else 'NOT IN'} ({placeholders})")
+                params.extend(value)
+            else:
+                clauses.append(f"{field} {_SQL_OPS[op]} ?")
+                params.append(value)
+    return " AND ".join(clauses), params
+
+
+def _quantized_factory(factory: str, quantization: str) -> str:
+    """The index_factory string with int8 storage: "Flat" -> "SQ8", "HNSW32" -> "HNSW32,SQ8", "IVF1024,Flat" -> "IVF1024,SQ8"."""
+    if quantization != "int8":
+        return factory
+    if factory == "Flat":
+        return "SQ8"
+    if factory.endswith(",Flat"):
+        return f"{factory[:-len(',Flat')]},SQ8"
+    if factory.startswith("HNSW") and "," not in factory:
+        return f"{factory},SQ8"
+    # Already names its own encoding (e.g. "IVF1024,PQ64")
+    return factory
+
+
+class FaissVectorStore(BaseVectorStore):
+    def __init__(
+        self,
+        collection_name: str,
+        index_dir: str = FAISS_INDEX_DIR,
+        factory: str = FAISS_INDEX_FACTORY,
+        quantization: str = FAISS_QUANTIZATION,
+        rerank_factor: int = FAISS_RERANK_FACTOR,
+    ):
+        if quantization not in ("none", "int8", "binary"):
+            raise ValueError(f"Unknown FAISS quantization '{quantization}' (expected none, int8 or binary)")
+        self.collection_name = collection_name
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        # Binary codes are scanned flat: FAISS's binary graph index takes no search parameters (filters)
+        self.factory = "BFlat" if quantization == "binary" else _quantized_factory(factory, quantization)
+        self.path = os.path.join(index_dir, collection_name)
+        os.makedirs(self.path, exist_ok=True)
+        self.index_path = os.path.join(self.path, "index.faiss")
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(self.path, "meta.sqlite3"), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # AUTOINCREMENT: FAISS ids of deleted rows are never reused while the main index may still hold them
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "fid INTEGER PRIMARY KEY AUTOINCREMENT, doc_id TEXT UNIQUE NOT NULL, document TEXT, "
+            "metadata TEXT, vector BLOB NOT NULL, indexed INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS docs_unindexed ON docs (indexed, fid)")
+        self._db.commit()
+
+        self.dim = None
+        self.main = None
+        self._main_mtime = None
+        self.delta = None
+        self._synced_fid = 0
+        self._indexed = 0
+        self._filter_cache = OrderedDict()
+        with self._lock:
+            self._load()
+        logger.info(f"[RAG] FAISS collection '{collection_name}' opened with {self.count()} documents")
+
+    # --- loading and synchronisation -------------------------------------------------
+
+    def _read_main(self):
+        read = faiss.read_index_binary if self.quantization == "binary" else faiss.read_index
+        try:
+            return read(self.index_path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            logger.debug(f"[RAG] FAISS '{self.collection_name}': main index cannot be mapped, reading it into memory ({e})")
+            return read(self.index_path, faiss.IO_FLAG_READ_ONLY)
+
+    def _load(self):
+        """(Re)open the main index, mapped where FAISS supports it, and rebuild the delta from unindexed rows."""
+        if os.path.exists(self.index_path):
+            try:
+                self.main = self._read_main()
+            except RuntimeError as e:
+                # Written under another FAISS_QUANTIZATION (float vs binary): serve every row
+                # from the delta until the next rebuild writes this setting's index
+                logger.warning(f"[RAG] FAISS '{self.collection_name}': cannot open the main index as {self.factory}, rebuilding ({e})")
+                os.remove(self.index_path)
+                self._db.execute("UPDATE docs SET indexed = 0")
+                self._db.commit()
+                return self._load()
+            self._main_mtime = os.stat(self.index_path).st_mtime_ns
+            self.dim = self.main.d
+            self._indexed = self._db.execute("SELECT COUNT(*) FROM docs WHERE indexed = 1").fetchone()[0]
+        else:
+            self.main = None
+            self._main_mtime = None
+            self._indexed = 0
+        self.delta = None
+        self._synced_fid = 0
+        self._filter_cache.clear()
+        self._load_delta_rows()
+
+    def _load_delta_rows(self):
+        rows = self._db.execute(
+            "SELECT fid, vector FROM docs WHERE indexed = 0 AND fid > ? ORDER BY fid", (self._synced_fid,)
+        ).fetchall()
+        if not rows:
+            return
+        fids = np.array([fid for fid, _ in rows], dtype="int64")
+        vectors = np.stack([np.frombuffer(blob, dtype="float32") for _, blob in rows])
+        if self.delta is None:
+            self.dim = self.dim or vectors.shape[1]
+            self.delta = faiss.IndexIDMap2(faiss.IndexFlatL2(self.dim))
+        self.delta.add_with_ids(vectors, fids)
+        self._synced_fid = int(fids[-1])
+        self._filter_cache.clear()
+
+    def _sync(self):
+        """Pick up a main index rebuilt, or rows added, by another process."""
+        mtime = os.stat(self.index_path).st_mtime_ns if os.path.exists(self.index_path) else None
+        if mtime != self._main_mtime:
+            self._load()
+        else:
+            self._load_delta_rows()
+
+    # --- writes ---------------------------------------------------------------------
+
+    def add_many(self, embeddings: list, documents: list, metadatas: list, ids: list = None):
+        """Upsert documents; see BaseVectorStore.add_many."""
+        if not documents:
+            return
+        embeddings, documents, metadatas, ids = self._batch(embeddings, documents, metadatas, ids)
+        vectors = np.asarray(embeddings, dtype="float32")
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+        rows = [
+            (doc_id, document, json.dumps(metadata or {}), vector.tobytes())
+            for doc_id, document, metadata, vector in zip(ids, documents, metadatas, vectors)
+        ]
+
+        with self._lock:
+            stored = {}
+            for start in range(0, len(ids), SQL_IN_BATCH):
+                batch = ids[start:start + SQL_IN_BATCH]
+                stored.update(self._db.execute(
+                    f"SELECT doc_id, vector FROM docs WHERE doc_id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall())
+            # Same vector: update the row in place. New vector: the row gets a new FAISS id,
+            # and the old one becomes a tombstone until the next rebuild.
+            in_place = [row for row in rows if stored.get(row[0]) == row[3]]
+            replaced = [row[0] for row in rows if row[0] in stored and stored[row[0]] != row[3]]
+            self.delete(replaced)
+            self._db.executemany(
+                "UPDATE docs SET document = ?, metadata = ? WHERE doc_id = ?",
+                [(document, metadata, doc_id) for doc_id, document, metadata, _ in in_place],
+            )
+            if in_place:
+                self._filter_cache.clear()
+            self._db.executemany(
+                "INSERT INTO docs (doc_id, document, metadata, vector) VALUES (?, ?, ?, ?)",
+                [row for row in rows if stored.get(row[0]) != row[3]],
+            )
+            self._db.commit()
+            self._sync()
+            if self.delta is not None and self.delta.ntotal >= FAISS_DELTA_MAX:
+                self.compact()
+
+    def delete(self, ids: list):
+        """Remove documents. Their vectors stay in the main index, skipped at search time, until compact()."""
+        if not ids:
+            return
+        with self._lock:
+            removed = []
+            for start in range(0, len(ids), SQL_IN_BATCH):
+                batch = ids[start:start + SQL_IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                for fid, indexed in self._db.execute(
+                    f"SELECT fid, indexed FROM docs WHERE doc_id IN ({placeholders})", batch
+                ):
+                    removed.append(fid)
+                    self._indexed -= indexed
+                self._db.execute(f"DELETE FROM docs WHERE doc_id IN ({placeholders})", batch)
+            self._db.commit()
+            if self.delta is not None and removed:
+                self.delta.remove_ids(np.array(removed, dtype="int64"))
+            self._filter_cache.clear()
+
+    def update_metadatas(self, ids: list, metadatas: list):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE docs SET metadata = ? WHERE doc_id = ?",
+                [(json.dumps(metadata or {}), doc_id) for doc_id, metadata in zip(ids, metadatas)],
+            )
+            self._db.commit()
+            self._filter_cache.clear()
+
+    def compact(self):
+        """Rebuild the main index from every row in the sidecar and swap it in atomically."""
+        with self._lock, open(os.path.join(self.path, ".lock"), "w") as lock_file:
+            # One rebuild at a time across processes
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            (max_fid, total) = self._db.execute("SELECT MAX(fid), COUNT(*) FROM docs").fetchone()
+            if not total:
+                # Everything was deleted: drop the index rather than keep searching tombstones
+                if os.path.exists(self.index_path):
+                    os.remove(self.index_path)
+                    self._load()
+                return
+
+            if self.quantization == "binary":
+                index = faiss.IndexBinaryIDMap2(faiss.index_binary_factory(self.dim, self.factory))
+            else:
+                index = faiss.index_factory(self.dim, f"IDMap2,{self.factory}")
+            if not index.is_trained:
+                # IVF-style indexes learn their coarse quantizer from the stored vectors
+                sample = self._read_vectors(limit=max(READ_BATCH, 256 * 100))[1]
+                try:
+                    index.train(sample)
+                except RuntimeError as e:
+                    logger.warning(f"[RAG] FAISS '{self.collection_name}': not enough vectors to train {self.factory} yet ({e})")
+                    return
+
+            offset = 0
+            while True:
+                fids, vectors = self._read_vectors(limit=READ_BATCH, offset=offset, max_fid=max_fid)
+                if not len(fids):
+                    break
+                index.add_with_ids(self._encode(vectors), fids)
+                offset += len(fids)
+
+            tmp_path = f"{self.index_path}.tmp"
+            (faiss.write_index_binary if self.quantization == "binary" else faiss.write_index)(index, tmp_path)
+            os.replace(tmp_path, self.index_path)
+            self._db.execute("UPDATE docs SET indexed = 1 WHERE fid <= ?", (max_fid,))
+            self._db.commit()
+            self._load()
+            logger.info(f"[RAG] FAISS '{self.collection_name}': main index rebuilt with {index.ntotal} vectors ({self.factory})")
+
+    def _read_vectors(self, limit: int, offset: int = 0, max_fid: int = None):
+        sql = "SELECT fid, vector FROM docs"
+        params = []
+        if max_fid is not None:
+            sql += " WHERE fid <= ?"
+            params.append(max_fid)
+        sql += " ORDER BY fid LIMIT ? OFFSET ?"
+        rows = self._db.execute(sql, [*params, limit, offset]).fetchall()
+        if not rows:
+            return np.empty(0, dtype="int64"), np.empty((0, self.dim), dtype="float32")
+        fids = np.array([fid for fid, _ in rows], dtype="int64")
+        return fids, np.stack([np.frombuffer(blob, dtype="float32") for _, blob in rows])
+
+    def _vectors(self, fids):
+        """Full-precision vectors for the given FAISS ids, in fid order; deleted rows are left out."""
+        rows = []
+        for start in range(0, len(fids), SQL_IN_BATCH):
+            batch = [int(fid) for fid in fids[start:start + SQL_IN_BATCH]]
+            rows.extend(self._db.execute(
+                f"SELECT fid, vector FROM docs WHERE fid IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        rows.sort()
+        if not rows:
+            return np.empty(0, dtype="int64"), np.empty((0, self.dim), dtype="float32")
+        return (
+            np.array([fid for fid, _ in rows], dtype="int64"),
+            np.stack([np.frombuffer(blob, dtype="float32") for _, blob in rows]),
+        )
+
+    def _encode(self, vectors):
+        """Vectors as the main index takes them: sign bits for a binary index, else unchanged."""
+        return np.packbits(vectors > 0, axis=1) if self.quantization == "binary" else vectors
+
+    # --- reads ----------------------------------------------------------------------
+
+    def existing_ids(self, ids: list) -> set:
+        found = set()
+        for start in range(0, len(ids), SQL_IN_BATCH):
+            batch = ids[start:start + SQL_IN_BATCH]
+            rows = self._db.execute(
+                f"SELECT doc_id FROM docs WHERE doc_id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            found.update(doc_id for (doc_id,) in rows)
+        return found
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def index_bytes(self) -> int:
+        """Size of the main index file, i.e. what each process maps into memory."""
+        return os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+
+    def iter_metadatas(self, batch_size: int = 1000):
+        last_fid = 0
+        while True:
+            rows = self._db.execute(
+                "SELECT fid, doc_id, metadata FROM docs WHERE fid > ? ORDER BY fid LIMIT ?", (last_fid, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            last_fid = rows[-1][0]
+            yield [doc_id for _, doc_id, _ in rows], [json.loads(metadata) for _, _, metadata in rows]
+
+    def iter_documents(self, batch_size: int = 1000):
+        last_fid = 0
+        while True:
+            rows = self._db.execute(
+                "SELECT fid, doc_id, document, metadata FROM docs WHERE fid > ? ORDER BY fid LIMIT ?", (last_fid, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            last_fid = rows[-1][0]
+            yield [row[1] for row in rows], [row[2] for row in rows], [json.loads(row[3]) for row in rows]
+
+    def search(self, embedding: list, k: int, where: dict = None) -> list:
+        query = np.asarray([embedding], dtype="float32")
+        with self._lock:
+            self._sync()
+            if self.dim is None:
+                return []
+            if where:
+                fids, vectors = self._filter_rows(where)
+                if not len(fids):
+                    return []
+                if vectors is not None:
+                    # Few matches: brute-force distances beat a filtered index walk
+                    hits = self._exact(query, fids, vectors)[:k]
+                else:
+                    hits = self._index_search(query, k, faiss.IDSelectorBatch(fids))
+            else:
+                hits = self._index_search(query, k)
+        return self._resolve(hits, k)
+
+    def _filter_rows(self, where):
+        """FAISS ids matching a metadata filter, plus their vectors when there are few enough for an exact scan."""
+        key = json.dumps(where, sort_keys=True)
+        if key in self._filter_cache:
+            self._filter_cache.move_to_end(key)
+            return self._filter_cache[key]
+
+        where_sql, params = _where_sql(where)
+        fids = np.array(
+            [fid for (fid,) in self._db.execute(f"SELECT fid FROM docs WHERE {where_sql} ORDER BY fid", params)],
+            dtype="int64",
+        )
+        vectors = None
+        if len(fids) and len(fids) <= FAISS_EXACT_FILTER_MAX:
+            vectors = self._vectors(fids)[1]
+
+        self._filter_cache[key] = (fids, vectors)
+        cached_bytes = lambda: sum(f.nbytes + (v.nbytes if v is not None else 0) for f, v in self._filter_cache.values())
+        while len(self._filter_cache) > 1 and cached_bytes() > FILTER_CACHE_MAX_BYTES:
+            self._filter_cache.popitem(last=False)
+        return fids, vectors
+
+    def _index_search(self, query, k, selector=None):
+        """Search the main and delta indexes and merge their candidates."""
+        hits = []
+        # Rows deleted from the sidecar stay in the main index until the next rebuild
+        stale = self.main.ntotal - self._indexed if self.main is not None else 0
+        for index in (self.main, self.delta):
+            if index is None or index.ntotal == 0:
+                continue
+            if index is self.main and self.quantization != "none":
+                # Approximate distances only pick the candidates; the ranking uses the full vectors
+                fetch = min(index.ntotal, k * self.rerank_factor + stale)
+                _, fids = index.search(self._encode(query), fetch, params=self._search_params(index, selector))
+                hits.extend(self._exact(query, *self._vectors(fids[0][fids[0] != -1])))
+                continue
+            fetch = min(index.ntotal, k + stale if index is self.main else k)
+            distances, fids = index.search(query, fetch, params=self._search_params(index, selector))
+            hits.extend((float(d), int(f)) for d, f in zip(distances[0], fids[0]) if f != -1)
+        hits.sort()
+        return hits
+
+    @staticmethod
+    def _exact(query, fids, vectors):
+        """(squared L2 distance, fid) pairs, closest first."""
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        return [(float(distances[i]), int(fids[i])) for i in np.argsort(distances)]
+
+    def _search_params(self, index, selector):
+        if isinstance(index, faiss.IndexBinary):
+            return faiss.SearchParameters(sel=selector) if selector is not None else None
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            # A selector prunes the graph walk, so search wider when one is set
+            ef_search = FAISS_EF_SEARCH * (4 if selector is not None else 1)
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+        if isinstance(inner, faiss.IndexIVF):
+            nprobe = FAISS_NPROBE * (4 if selector is not None else 1)
+            return faiss.SearchParametersIVF(sel=selector, nprobe=min(nprobe, inner.nlist))
+        return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+    def _resolve(self, hits, k):
+        """Look up the sidecar rows for the closest hits, skipping deleted ones."""
+        fids = [fid for _, fid in hits]
+        rows = {}
+        for start in range(0, len(fids), SQL_IN_BATCH):
+            batch = fids[start:start + SQL_IN_BATCH]
+            for fid, doc_id, document, metadata in self._db.execute(
+                f"SELECT fid, doc_id, document, metadata FROM docs WHERE fid IN ({','.join('?' * len(batch))})", batch
+            ):
+                rows[fid] = (doc_id, document, json.loads(metadata))
+
+        results = []
+        for distance, fid in hits:
+            if fid in rows:
+                doc_id, document, metadata = rows[fid]
+                results.append({"id": doc_id, "text": document, "metadata": metadata, "distance": distance})
+            if len(results) >= k:
+                break
+        return results
@@ -0,0 +1,10 @@
+# rag/filters.py
+
+def metadata_filter(**conditions):
+    """
+    Chroma `where` filter matching every given metadata field (None values are ignored).
+    """
+    clauses = [{key: {"$eq": value}} for key, value in conditions.items() if value is not None]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
@@ -1,27 +1,123 @@
+import os
+import re
+import json
+import time
+from datetime import datetime, timezone
 from rag.chunker import chunk_policy_text
-from rag.vectorstore import VectorStore
-from rag.embeddings import embed_text
+from rag.vectorstore import create_vector_store, content_id
+from rag.config import POLICY_COLLECTION, HYBRID_RETRIEVAL, POLICY_INGESTION_LOG_PATH
+from rag.bm25 import BM25Index
+from rag.embeddings import embed_documents
+from rag.embedding_cache import content_hash
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Header lines of the policy document, e.g. "Policy ID: SOP-MASTER-RET-AI-034" and "Version: 4.1"
+POLICY_ID_PATTERN = re.compile(r"^\s*Policy ID:\s*(\S+)", re.MULTILINE)
+POLICY_VERSION_PATTERN = re.compile(r"^\s*Version:\s*(\S+)", re.MULTILINE)
+
+
+def policy_header(policy_text: str, file_path: str):
+    """
+    Policy id and version from the document header. Without a Version line the
+    version is derived from the content, so any edit still counts as a new version.
+    """
+    policy_id = POLICY_ID_PATTERN.search(policy_text)
+    version = POLICY_VERSION_PATTERN.search(policy_text)
+    return (
+        policy_id.group(1) if policy_id else os.path.splitext(os.path.basename(file_path))[0],
+        version.group(1) if version else f"sha256:{content_hash(policy_text)[:12]}",
+    )
+
+
+def _record_ingestion(stats: dict):
+    try:
+        os.makedirs(os.path.dirname(POLICY_INGESTION_LOG_PATH), exist_ok=True)
+        with open(POLICY_INGESTION_LOG_PATH, "a", encoding="utf-8") as log:
+            log.write(json.dumps(stats) + "\n")
+    except OSError as e:
+        logger.warning(f"[RAG] Could not record policy ingestion in {POLICY_INGESTION_LOG_PATH}: {e}")
+
 
 def load_store_policy(file_path: str):
+    """
+    Bring the policy collection in line with the policy file: chunks are
+    content-addressed, so only new or edited chunks are embedded and written,
+    chunks no longer in the file are deleted, and unchanged chunks only get
+    their metadata (version, position) refreshed.
+
+    Returns the store, a BM25 index over the chunks when HYBRID_RETRIEVAL is on
+    (else None), and the ingestion stats, which are also appended to
+    POLICY_INGESTION_LOG_PATH.
+    """
+    started = time.perf_counter()
     policy_text = open(file_path, "r", encoding="utf-8").read()
+    policy_id, version = policy_header(policy_text, file_path)
 
     chunks = chunk_policy_text(policy_text)
 
-    docs = [
-        {
+    docs = {}
+    for i, chunk in enumerate(chunks):
+        # Content-addressed id, the store's default: the same chunk text always maps to the
+        # same document, however it is written (ids of the older "policy-<hash>" form are
+        # no longer in the file's id set, so the next ingestion replaces them)
+        doc_id = content_id(chunk)
+        # A chunk repeated verbatim is stored once, at its first position
+        docs.setdefault(doc_id, {
+            "id": doc_id,
             "text": chunk,
             "metadata": {
-                "source": "SOP_MASTER_RET_AI_4.1",
+                "source": policy_id,
                 "chunk_id": i,
                 "policy_type": "store_operations",
-                "version": "4.1"
+                "version": version
             }
-        }
-        for i, chunk in enumerate(chunks)
-    ]
-
-    store = VectorStore()
-    for d in docs:
-        emb = embed_text(d["text"])
-        store.add(emb, d["text"], d["metadata"])
-    return store
\ No newline at end of file
+        })
+    docs = list(docs.values())
+
+    store = create_vector_store(POLICY_COLLECTION)
+    stored = {
+        doc_id: metadata
+        for ids, metadatas in store.iter_metadatas()
+        for doc_id, metadata in zip(ids, metadatas)
+    }
+
+    current = {d["id"] for d in docs}
+    new = [d for d in docs if d["id"] not in stored]
+    stale = [doc_id for doc_id in stored if doc_id not in current]
+    # Unchanged text, but a new version or a shifted position
+    moved = [d for d in docs if d["id"] in stored and stored[d["id"]] != d["metadata"]]
+
+    store.add_many(
+        embeddings=embed_documents([d["text"] for d in new]),
+        documents=[d["text"] for d in new],
+        metadatas=[d["metadata"] for d in new],
+        ids=[d["id"] for d in new],
+    )
+    store.delete(stale)
+    store.update_metadatas([d["id"] for d in moved], [d["metadata"] for d in moved])
+    if stale:
+        store.compact()
+
+    stats = {
+        "policy_id": policy_id,
+        "version": version,
+        "file": file_path,
+        "file_sha256": content_hash(policy_text),
+        "ingested_at": datetime.now(timezone.utc).isoformat(),
+        "chunks": len(docs),
+        "unchanged": len(docs) - len(new),
+        "added": len(new),
+        "deleted": len(stale),
+        "metadata_updated": len(moved),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    _record_ingestion(stats)
+    logger.info(
+        f"[RAG] Policy {policy_id} v{version} ({file_path}): {stats['chunks']} chunks, "
+        f"{stats['added']} added, {stats['deleted']} deleted, {stats['metadata_updated']} metadata updated, "
+        f"{stats['unchanged']} unchanged"
+    )
+    keyword_index = BM25Index(docs) if HYBRID_RETRIEVAL else None
+    return store, keyword_index, stats
@@ -0,0 +1,45 @@
+# rag/memory_compaction.py
+"""
+Evict incident memories that have decayed out of relevance.
+
+A memory's score is memory_decay.decay_score(timestamp, severity); once it
+falls below MEMORY_EVICTION_THRESHOLD the memory would rank below fresh
+incidents anyway, so it is deleted to keep the memory index small. Memories
+without a timestamp (written before timestamps were recorded) are kept.
+
+The API runs this every MEMORY_COMPACTION_INTERVAL_SECONDS; to run it once,
+from app/:  python -m rag.memory_compaction
+"""
+from agents.memory_decay import decay_score
+from rag.vectorstore import create_vector_store
+from rag.config import MEMORY_COLLECTION, MEMORY_EVICTION_THRESHOLD
+from config.logging_config import setup_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+def compact_memories(store, threshold: float = MEMORY_EVICTION_THRESHOLD) -> int:
+    """Delete memories scoring below threshold; returns how many were evicted."""
+    evict, untimed = [], 0
+    # Collect first, delete after: deleting while paging would shift the pages
+    for ids, metadatas in store.iter_metadatas():
+        for doc_id, metadata in zip(ids, metadatas):
+            metadata = metadata or {}
+            if metadata.get("timestamp") is None:
+                untimed += 1
+            elif decay_score(metadata["timestamp"], metadata.get("severity") or 0) < threshold:
+                evict.append(doc_id)
+
+    if evict:
+        store.delete(evict)
+        store.compact()
+    logger.info(
+        f"[RAG] Memory compaction: evicted {len(evict)} memories below score {threshold}, "
+        f"{store.count()} remain ({untimed} without a timestamp)"
+    )
+    return len(evict)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    compact_memories(create_vector_store(MEMORY_COLLECTION))
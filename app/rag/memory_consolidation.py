@@ -0,0 +1,161 @@
+# rag/memory_consolidation.py
+"""
+Replace clusters of near-identical incident memories with summary memories.
+
+learning_node stores one record per incident, so months of similar thefts or
+spills fill the top-k with near-copies. This job groups memories by store and
+incident type (the filters memory lookups use), clusters each group by
+embedding similarity, and replaces every cluster of at least
+MEMORY_CONSOLIDATION_MIN_CLUSTER memories with one summary memory: the number
+of incidents, their severity range, outcomes and period, the ids of the source
+incidents, and the full record of the most representative one.
+
+Only memories older than MEMORY_CONSOLIDATION_MIN_AGE_DAYS are consolidated, so
+recent incidents stay retrievable in full; summaries are not consolidated again.
+Vectors come from the embedding cache, so a pass only embeds the new summaries.
+
+The API runs this after each memory compaction; to run it once, from app/:
+  python -m rag.memory_consolidation [--dry-run]
+"""
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+import numpy as np
+from rag.vectorstore import create_vector_store
+from rag.embeddings import embed_documents
+from rag.config import (
+    MEMORY_COLLECTION, MEMORY_CONSOLIDATION_SIMILARITY, MEMORY_CONSOLIDATION_MIN_CLUSTER,
+    MEMORY_CONSOLIDATION_MIN_AGE_DAYS,
+)
+from config.logging_config import setup_logging, get_logger
+
+logger = get_logger(__name__)
+
+# "Outcome: resolved" / "Outcome: escalated" line of a learning_node record
+OUTCOME_PATTERN = re.compile(r"^\s*Outcome:\s*(\w+)", re.MULTILINE)
+
+
+def cluster_memories(vectors: np.ndarray, similarity: float) -> list:
+    """
+    Greedy single-pass clustering of unit vectors: each joins the cluster whose
+    centroid it is most similar to when the cosine similarity reaches the
+    threshold, else starts a new cluster. Returns lists of row positions.
+    """
+    clusters = []
+    sums = np.empty((0, vectors.shape[1]), dtype="float32")
+    centroids = sums
+    for position, vector in enumerate(vectors):
+        if clusters:
+            scores = centroids @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= similarity:
+                clusters[best].append(position)
+                sums[best] += vector
+                centroids[best] = sums[best] / np.linalg.norm(sums[best])
+                continue
+        clusters.append([position])
+        sums = np.vstack([sums, vector])
+        centroids = np.vstack([centroids, vector])
+    return clusters
+
+
+def _date(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).date().isoformat()
+
+
+def summarize_cluster(memories: list, vectors: np.ndarray):
+    """Text and metadata of the summary memory for a cluster (memories: dicts with id, text and metadata)."""
+    metadatas = [memory["metadata"] for memory in memories]
+    # The member closest to the centroid stands for the cluster
+    representative = memories[int(np.argmax(vectors @ vectors.mean(axis=0)))]
+    severities = [metadata["severity"] for metadata in metadatas if metadata.get("severity") is not None]
+    timestamps = [metadata["timestamp"] for metadata in metadatas if metadata.get("timestamp") is not None]
+    incident_ids = [metadata["incident_id"] for metadata in metadatas if metadata.get("incident_id")]
+    outcomes = Counter()
+    for memory in memories:
+        match = OUTCOME_PATTERN.search(memory["text"])
+        if match:
+            outcomes[match.group(1)] += 1
+
+    lines = [
+        f"Consolidated Memory: {len(memories)} similar incidents",
+        f"Incident Type: {metadatas[0].get('incident_type', 'unknown')}",
+    ]
+    if severities:
+        low, high = min(severities), max(severities)
+        lines.append(f"Severity: {low}" if low == high else f"Severity: {low}-{high}")
+    if outcomes:
+        lines.append("Outcomes: " + ", ".join(f"{count} {outcome}" for outcome, count in outcomes.most_common()))
+    if timestamps:
+        lines.append(f"Period: {_date(min(timestamps))} to {_date(max(timestamps))}")
+    sources = ", ".join(incident_ids) or "not recorded"
+    if 0 < len(incident_ids) < len(memories):
+        sources += f" (and {len(memories) - len(incident_ids)} recorded without an incident id)"
+    lines.append(f"Source Incidents: {sources}")
+    text = "\n" + "\n".join(lines) + "\nRepresentative Incident:\n" + representative["text"].strip() + "\n"
+
+    metadata = {
+        "store_id": metadatas[0].get("store_id"),
+        "incident_type": metadatas[0].get("incident_type"),
+        # Ranked (and decayed) like the most severe and most recent of its sources
+        "severity": max(severities) if severities else None,
+        "timestamp": max(timestamps) if timestamps else None,
+        "consolidated": True,
+        "source_count": len(memories),
+        # Comma-separated: Chroma metadata values are scalars
+        "source_incidents": ",".join(incident_ids),
+    }
+    return text, {key: value for key, value in metadata.items() if value is not None}
+
+
+def consolidate_memories(
+    store,
+    similarity: float = MEMORY_CONSOLIDATION_SIMILARITY,
+    min_cluster: int = MEMORY_CONSOLIDATION_MIN_CLUSTER,
+    min_age_days: float = MEMORY_CONSOLIDATION_MIN_AGE_DAYS,
+    dry_run: bool = False,
+) -> int:
+    """Replace clusters of similar memories with summaries; returns how many memories were (or would be) replaced."""
+    cutoff = time.time() - min_age_days * 86400
+    groups = {}
+    for ids, documents, metadatas in store.iter_documents():
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            metadata = metadata or {}
+            # Memories without a timestamp predate timestamps, so they are old enough
+            if metadata.get("consolidated") or (metadata.get("timestamp") or 0) > cutoff:
+                continue
+            key = (metadata.get("store_id"), metadata.get("incident_type"))
+            groups.setdefault(key, []).append({"id": doc_id, "text": document or "", "metadata": metadata})
+
+    summaries, replaced = [], []
+    for memories in groups.values():
+        if len(memories) < min_cluster:
+            continue
+        # Oldest first, so a pass over the same memories always forms the same clusters
+        memories.sort(key=lambda memory: (memory["metadata"].get("timestamp") or 0, memory["id"]))
+        vectors = np.asarray(embed_documents([memory["text"] for memory in memories]), dtype="float32")
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for cluster in cluster_memories(vectors, similarity):
+            if len(cluster) >= min_cluster:
+                summaries.append(summarize_cluster([memories[i] for i in cluster], vectors[cluster]))
+                replaced.extend(memories[i]["id"] for i in cluster)
+
+    if summaries and not dry_run:
+        texts = [text for text, _ in summaries]
+        # Summaries are written before their sources are deleted: an interrupted pass
+        # leaves duplicates behind, never a gap
+        store.add_many(embeddings=embed_documents(texts), documents=texts, metadatas=[metadata for _, metadata in summaries])
+        store.delete(replaced)
+        store.compact()
+    logger.info(
+        f"[RAG] Memory consolidation: {len(replaced)} memories in {len(summaries)} clusters "
+        f"{'found' if dry_run else 'replaced by summaries'}, {store.count()} memories stored"
+    )
+    return len(replaced)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    consolidate_memories(create_vector_store(MEMORY_COLLECTION), dry_run="--dry-run" in sys.argv[1:])
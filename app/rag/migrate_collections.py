@@ -0,0 +1,64 @@
+# rag/migrate_collections.py
+"""
+One-off migration from the single "incidents_and_policies" collection to the
+separate policy and memory collections.
+
+Learned incident memories are copied, with their stored embeddings, into the
+memory collection; with a local embedding model active they are re-embedded.
+Policy chunks are not copied: load_store_policy re-ingests them into the
+policy collection from the persistent embedding cache.
+
+Run from app/:  python -m rag.migrate_collections [--drop-legacy]
+"""
+import sys
+from rag.vectorstore import ChromaVectorStore, create_vector_store
+from rag.config import LEGACY_COLLECTION, MEMORY_COLLECTION, EMBEDDING_MODEL, AZURE_EMBEDDING_MODEL
+from rag.embeddings import embed_documents
+from config.logging_config import setup_logging, get_logger
+
+logger = get_logger(__name__)
+
+PAGE_SIZE = 500
+
+
+def migrate(drop_legacy: bool = False) -> int:
+    # The legacy collection only ever existed in Chroma; the target uses VECTOR_BACKEND
+    legacy = ChromaVectorStore(LEGACY_COLLECTION)
+    memories = create_vector_store(MEMORY_COLLECTION)
+
+    copied = 0
+    offset = 0
+    while True:
+        page = legacy.collection.get(
+            limit=PAGE_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"]
+        )
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+
+        # Policy chunks carry a policy_type; everything else was written by learning_node
+        rows = [
+            (doc_id, embedding, document, metadata)
+            for doc_id, embedding, document, metadata in zip(
+                page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+            )
+            if "policy_type" not in (metadata or {})
+        ]
+        if rows:
+            ids, embeddings, documents, metadatas = (list(column) for column in zip(*rows))
+            if EMBEDDING_MODEL != AZURE_EMBEDDING_MODEL:
+                # The legacy vectors came from the Azure model; re-embed for the active one
+                embeddings = embed_documents(documents)
+            memories.add_many(embeddings=embeddings, documents=documents, metadatas=metadatas, ids=ids)
+            copied += len(rows)
+
+    logger.info(f"[RAG] Copied {copied} incident memories from '{LEGACY_COLLECTION}' to '{MEMORY_COLLECTION}'")
+    if drop_legacy:
+        legacy.client.delete_collection(LEGACY_COLLECTION)
+        logger.info(f"[RAG] Dropped legacy collection '{LEGACY_COLLECTION}'")
+    return copied
+
+
+if __name__ == "__main__":
+    setup_logging()
+    migrate(drop_legacy="--drop-legacy" in sys.argv[1:])
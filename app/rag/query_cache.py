@@ -0,0 +1,146 @@
+# rag/query_cache.py
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import numpy as np
+from metrics import record_cache_lookup
+
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU cache whose entries also expire after ttl seconds.
+
+    clear() bumps a generation counter; a put() tagged with an older generation
+    is dropped, so a lookup that started before an invalidation can't store a
+    stale result after it.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        record_cache_lookup(self.name, entry is not None)
+        return None if entry is None else entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Membership check that, unlike get(), leaves the hit/miss counts alone."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class SemanticCache:
+    """
+    Bounded, thread-safe LRU cache looked up by embedding: get() returns the
+    value stored for the most similar cached query in the same scope, provided
+    their cosine similarity reaches the threshold.
+
+    Scopes keep lookups that must not answer each other apart (for RAG
+    contexts: the metadata filter and the context budget). clear() and
+    generation-tagged put() work as in TTLCache.
+    """
+
+    def __init__(self, name: str, maxsize: int, threshold: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        # (scope, query text) -> value, in LRU order
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        # scope -> {query text: unit-length embedding}
+        self._vectors: Dict[Hashable, Dict[str, np.ndarray]] = {}
+        # scope -> (query texts, stacked embeddings), rebuilt after the scope changes
+        self._matrices: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: Hashable, embedding) -> Optional[Any]:
+        query = np.asarray(embedding, dtype="float32")
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self._lock:
+            entry = None
+            if scope in self._vectors:
+                if scope not in self._matrices:
+                    texts = list(self._vectors[scope])
+                    self._matrices[scope] = (texts, np.stack([self._vectors[scope][text] for text in texts]))
+                texts, matrix = self._matrices[scope]
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry = (scope, texts[best])
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(entry)
+                self.hits += 1
+                value = self._entries[entry]
+        record_cache_lookup(self.name, entry is not None)
+        return None if entry is None else value
+
+    def put(self, scope: Hashable, text: str, embedding, value: Any, generation: Optional[int] = None):
+        if self.maxsize <= 0:
+            return
+        vector = np.asarray(embedding, dtype="float32")
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[(scope, text)] = value
+            self._entries.move_to_end((scope, text))
+            self._vectors.setdefault(scope, {})[text] = vector
+            self._matrices.pop(scope, None)
+            while len(self._entries) > self.maxsize:
+                (old_scope, old_text), _ = self._entries.popitem(last=False)
+                del self._vectors[old_scope][old_text]
+                if not self._vectors[old_scope]:
+                    del self._vectors[old_scope]
+                self._matrices.pop(old_scope, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+            self._matrices.clear()
+            self.generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -1,45 +1,293 @@
 # rag/rag_engine.py
 
+import os
+import json
+import asyncio
 import logging
-from rag.embeddings import embed_text
-from rag.retriever import retrieve
+from rag.embeddings import aembed_text, aembed_texts, embed_documents, aembed_documents
+from rag.query_cache import TTLCache, SemanticCache
+from rag.context import pack_context, decayed_relevance
+from rag.bm25 import reciprocal_rank_fusion, rrf_relevance
+from rag.loader import load_store_policy
+from rag.config import (
+    QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL_SECONDS, SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD,
+    CONTEXT_CANDIDATE_FACTOR, CONTEXT_MAX_TOKENS, POLICY, MEMORY,
+    HYBRID_RRF_K, HYBRID_KEYWORD_MAX_TERMS,
+)
 from config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
 class RAGEngine:
-    def __init__(self, vector_store):
-        self.vectorstore = vector_store
+    def __init__(self, policy_store, memory_store, policy_keyword_index=None, policy_ingestion=None, policy_path=None):
+        # Separate namespaces: SOP chunks (read-mostly) and learned incident memories
+        self.stores = {POLICY: policy_store, MEMORY: memory_store}
+        # Parsed version and file hash of the ingested policy (rag.loader stats): a change
+        # to either invalidates the cached policy results
+        self.policy_version = (policy_ingestion or {}).get("version")
+        self.policy_sha256 = (policy_ingestion or {}).get("file_sha256")
+        # Policy file this process ingested, and its mtime then: every worker re-ingests it
+        # on its next lookup once it changes, whichever process served /policy/reload
+        self.policy_path = policy_path
+        self._policy_mtime = self._policy_file_mtime()
+        self._policy_lock = asyncio.Lock()
+        # BM25 over the policy chunks (rag.bm25), fused with unfiltered policy searches
+        self.keyword_indexes = {POLICY: policy_keyword_index} if policy_keyword_index is not None else {}
+        # Query embeddings depend only on the text; retrieval results also on the
+        # collection, so each namespace's results are invalidated when it changes.
+        self.query_embeddings = TTLCache("query_embedding", QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL_SECONDS)
+        self.retrievals = {
+            namespace: TTLCache(f"{namespace}_retrieval", RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL_SECONDS)
+            for namespace in self.stores
+        }
+        # Packed contexts by query embedding, so near-identical lookups (the same SOP
+        # question from many incidents) skip the vector search
+        self.contexts = {
+            namespace: SemanticCache(f"{namespace}_semantic", SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD)
+            for namespace in self.stores
+        }
         logger.info("RAGEngine initialized")
 
-    def query(self, query_text, top_k=5):
-        logger.debug(f"[RAG] Query: {query_text[:100]}... (top_k={top_k})")
-        
-        raw_results = retrieve(query_text, self.vectorstore, k=20)
+    async def aquery(self, query_text, top_k=5, max_tokens=None, namespace=POLICY, where=None, scope=None):
+        """
+        Retrieve context for a prompt: the top_k closest distinct chunks that fit
+        within max_tokens (CONTEXT_MAX_TOKENS by default). Embeds with the async
+        client and runs the vector search off the event loop.
+
+        namespace selects policy or memory documents; where is a Chroma metadata
+        filter (see rag.filters.metadata_filter) applied inside the search.
+        scope holds values the query text was built from that must never be
+        mixed up (e.g. severity): only lookups with equal scopes share a cached
+        context, however similar their texts.
+        """
+        logger.debug(f"[RAG] Query ({namespace}): {query_text[:100]}... (top_k={top_k}, where={where})")
+        await self._arefresh_policy()
+
+        k = top_k * CONTEXT_CANDIDATE_FACTOR
+        contexts = self.contexts[namespace]
+        if not contexts.maxsize or self._keyword_only(query_text, namespace, where):
+            raw_results = await self._aretrieve(query_text, k, namespace, where)
+            return self._build_context(raw_results, top_k, max_tokens, namespace)
+
+        embedding = await self._aquery_embedding(query_text)
+        context_scope = self._context_scope(top_k, max_tokens, where, scope)
+        cached = contexts.get(context_scope, embedding)
+        if cached is not None:
+            logger.debug(f"[RAG] Semantic cache hit ({namespace}): {query_text[:100]}")
+            return cached
+
+        generation = contexts.generation
+        raw_results = await self._aretrieve(query_text, k, namespace, where)
+        context = self._build_context(raw_results, top_k, max_tokens, namespace)
+        contexts.put(context_scope, query_text, embedding, context, generation)
+        return context
+
+    async def aprefetch(self, queries):
+        """
+        Warm the retrieval cache for several upcoming aquery() calls, given as
+        dicts of their keyword arguments: one batched embedding request for the
+        texts not cached yet, then one multi-query search per namespace and filter.
+        """
+        await self._arefresh_policy()
+        groups = {}
+        for query in queries:
+            namespace = query.get("namespace", POLICY)
+            k = query.get("top_k", 5) * CONTEXT_CANDIDATE_FACTOR
+            key = self._retrieval_key(query["query_text"], k, query.get("where"))
+            if key in self.retrievals[namespace] or self._keyword_only(query["query_text"], namespace, query.get("where")):
+                # Cached already, or answered locally by the keyword index
+                continue
+            group = groups.setdefault((namespace, k, key[2]), {"where": query.get("where"), "keys": []})
+            group["keys"].append(key)
+        if not groups:
+            return
+
+        texts = list(dict.fromkeys(key[0] for group in groups.values() for key in group["keys"]))
+        embeddings = {text: self.query_embeddings.get(text) for text in texts}
+        missing = [text for text, embedding in embeddings.items() if embedding is None]
+        if missing:
+            for text, embedding in zip(missing, await aembed_texts(missing)):
+                embeddings[text] = embedding
+                self.query_embeddings.put(text, embedding)
+
+        async def search(namespace, k, group):
+            retrievals = self.retrievals[namespace]
+            generation = retrievals.generation
+            results = await asyncio.to_thread(
+                self.stores[namespace].search_many, [embeddings[key[0]] for key in group["keys"]], k, group["where"]
+            )
+            for key, result in zip(group["keys"], results):
+                retrievals.put(key, self._fuse(key[0], k, namespace, group["where"], result), generation)
+
+        await asyncio.gather(*(search(namespace, k, group) for (namespace, k, _), group in groups.items()))
+        logger.info(
+            f"[RAG] Prefetched {sum(len(group['keys']) for group in groups.values())} queries "
+            f"with {len(missing)} embeddings and {len(groups)} searches"
+        )
+
+    @staticmethod
+    def _retrieval_key(query_text, k, where):
+        return (query_text, k, json.dumps(where, sort_keys=True))
+
+    @staticmethod
+    def _context_scope(top_k, max_tokens, where, scope):
+        """Semantic cache scope: only lookups with the same filter, context budget and scope share contexts."""
+        return (top_k, max_tokens or CONTEXT_MAX_TOKENS, json.dumps(where, sort_keys=True), json.dumps(scope, sort_keys=True))
+
+    async def _aquery_embedding(self, query_text):
+        embedding = self.query_embeddings.get(query_text)
+        if embedding is None:
+            embedding = await aembed_text(query_text)
+            self.query_embeddings.put(query_text, embedding)
+        return embedding
+
+    async def _aretrieve(self, query_text, k, namespace, where):
+        retrievals = self.retrievals[namespace]
+        key = self._retrieval_key(query_text, k, where)
+        cached = retrievals.get(key)
+        if cached is not None:
+            return cached
+
+        generation = retrievals.generation
+        if self._keyword_only(query_text, namespace, where):
+            results = self._keyword_search(query_text, k, namespace)
+        else:
+            embedding = await self._aquery_embedding(query_text)
+            vector_results = await asyncio.to_thread(self.stores[namespace].search, embedding, k, where)
+            results = self._fuse(query_text, k, namespace, where, vector_results)
+        retrievals.put(key, results, generation)
+        return results
+
+    def _keyword_only(self, query_text, namespace, where):
+        """Short queries whose terms all occur in the policy skip the embedding and vector search."""
+        index = self.keyword_indexes.get(namespace)
+        return index is not None and where is None and index.covers(query_text, HYBRID_KEYWORD_MAX_TERMS)
+
+    def _keyword_search(self, query_text, k, namespace):
+        logger.debug(f"[RAG] Keyword query answered from the BM25 index: {query_text[:100]}")
+        return reciprocal_rank_fusion([self.keyword_indexes[namespace].search(query_text, k)], k, HYBRID_RRF_K)
+
+    def _fuse(self, query_text, k, namespace, where, vector_results):
+        """Reciprocal rank fusion of vector and BM25 results, for unfiltered searches of indexed namespaces."""
+        index = self.keyword_indexes.get(namespace)
+        if index is None or where is not None:
+            return vector_results
+        return reciprocal_rank_fusion([vector_results, index.search(query_text, k)], k, HYBRID_RRF_K)
+
+    def invalidate(self, namespace=MEMORY):
+        """Drop cached retrieval results and contexts after a namespace's collection changed."""
+        self.retrievals[namespace].clear()
+        self.contexts[namespace].clear()
+
+    def _policy_file_mtime(self):
+        try:
+            return os.stat(self.policy_path).st_mtime_ns if self.policy_path else None
+        except OSError:
+            return None
+
+    async def areload_policy(self, force=True):
+        """
+        Re-ingest the policy file and switch to it; returns the ingestion stats.
+        Without force, only when the file changed since this process last ingested it.
+        """
+        async with self._policy_lock:
+            mtime = self._policy_file_mtime()
+            if not force and mtime == self._policy_mtime:
+                # Reloaded by a concurrent lookup meanwhile
+                return None
+            store, keyword_index, stats = await asyncio.to_thread(load_store_policy, self.policy_path)
+            self._policy_mtime = mtime
+            self.set_policy(store, keyword_index, stats)
+            return stats
+
+    async def _arefresh_policy(self):
+        """A stat() per lookup: re-ingest once the policy file changed on disk."""
+        if self.policy_path and self._policy_file_mtime() != self._policy_mtime:
+            logger.info(f"[RAG] Policy file {self.policy_path} changed on disk; re-ingesting")
+            await self.areload_policy(force=False)
+
+    def set_policy(self, policy_store, policy_keyword_index, policy_ingestion):
+        """Switch to a re-ingested policy; cached policy results are dropped when its version or file changed."""
+        self.stores[POLICY] = policy_store
+        if policy_keyword_index is not None:
+            self.keyword_indexes[POLICY] = policy_keyword_index
+        else:
+            self.keyword_indexes.pop(POLICY, None)
+        version, sha256 = policy_ingestion.get("version"), policy_ingestion.get("file_sha256")
+        if (version, sha256) != (self.policy_version, self.policy_sha256):
+            # The hash also catches edits made without bumping the Version: header
+            logger.info(f"[RAG] Policy changed (version {self.policy_version} -> {version}); policy caches cleared")
+            self.policy_version, self.policy_sha256 = version, sha256
+            self.invalidate(POLICY)
+
+    def _build_context(self, raw_results, top_k, max_tokens=None, namespace=POLICY):
         logger.debug(f"[RAG] Found {len(raw_results)} raw results")
-        
-        context = "\n".join(d.get("text") for d in raw_results)
-        logger.info(f"[RAG] Query completed - Returning {len(raw_results)} documents, {len(context)} chars of context")
+
+        # Memories are re-ranked by age and severity; fused policy results keep their
+        # fusion order; plain vector results are ranked by distance
+        if namespace == MEMORY:
+            relevance = decayed_relevance
+        elif raw_results and "rrf_score" in raw_results[0]:
+            relevance = rrf_relevance
+        else:
+            relevance = None
+        packed = pack_context(raw_results, top_k, max_tokens or CONTEXT_MAX_TOKENS, relevance)
+        context = "\n\n".join(d["text"] for d in packed)
+        logger.info(
+            f"[RAG] Query completed - Returning {len(packed)} of {len(raw_results)} documents, "
+            f"{sum(d['tokens'] for d in packed)} tokens of context"
+        )
 
         return {
-            "context": context
+            "context": context,
+            "documents": packed
         }
-    
+
     def add_document(self, document: str, metadata: dict):
         """
-        Add a document to the underlying vector store.
+        Add a learned incident memory to the memory collection.
+        """
+        self.add_documents([document], [metadata])
+
+    def add_documents(self, documents: list, metadatas: list):
+        """
+        Add many documents with batched embedding requests and one store write.
         """
         try:
             # Filter metadata to remove None values and ensure ChromaDB-compatible types
-            filtered_metadata = {k: v for k, v in metadata.items() if v is not None}
-            embedding = embed_text(document)
-            self.vectorstore.add(
-                embedding=embedding,
-                document=document,
-                metadata=filtered_metadata
+            filtered_metadatas = [{k: v for k, v in metadata.items() if v is not None} for metadata in metadatas]
+            embeddings = embed_documents(documents)
+            self.stores[MEMORY].add_many(
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=filtered_metadatas
             )
-            logger.info("[RAG] Document added to vector store")
+            self.invalidate(MEMORY)
+            logger.info(f"[RAG] {len(documents)} document(s) added to vector store")
         except Exception as e:
-            logger.error(f"[RAG] Failed to add document: {e}", exc_info=True)
+            logger.error(f"[RAG] Failed to add documents: {e}", exc_info=True)
+
+    async def aadd_document(self, document: str, metadata: dict):
+        """
+        Async variant of add_document.
+        """
+        await self.aadd_documents([document], [metadata])
 
-    
\ No newline at end of file
+    async def aadd_documents(self, documents: list, metadatas: list):
+        """
+        Async variant of add_documents.
+        """
+        try:
+            filtered_metadatas = [{k: v for k, v in metadata.items() if v is not None} for metadata in metadatas]
+            embeddings = await aembed_documents(documents)
+            await asyncio.to_thread(
+                self.stores[MEMORY].add_many,
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=filtered_metadatas
+            )
+            self.invalidate(MEMORY)
+            logger.info(f"[RAG] {len(documents)} document(s) added to vector store")
+        except Exception as e:
+            logger.error(f"[RAG] Failed to add documents: {e}", exc_info=True)
@@ -0,0 +1,26 @@
+# rag/tokens.py
+
+from functools import lru_cache
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """cl100k_base (text-embedding-3 and gpt-4 family), or None if it can't be loaded."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken downloads the encoding on first use; offline hosts fall back to an estimate
+        logger.warning(f"[RAG] tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        # Roughly 4 characters per token for English text; err on the high side
+        return len(text) // 3 + 1
+    return len(encoding.encode(text, disallowed_special=()))
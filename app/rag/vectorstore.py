@@ -1,17 +1,95 @@
 # rag/vectorstore.py
 
-import chromadb
-from chromadb.config import Settings
 import os
+from rag.config import POLICY_COLLECTION, VECTOR_BACKEND
+from rag.embedding_cache import content_hash
 
-class VectorStore:
-    def __init__(self):
+def content_id(document: str) -> str:
+    """Default document id: stable across processes, unlike hash(), so re-adding a text updates it in place."""
+    return content_hash(document)
+
+class BaseVectorStore:
+    """
+    Interface shared by the vector store backends (Chroma, FAISS).
+
+    search() returns dicts with id, text, metadata and distance (squared L2,
+    smaller is closer); where is a Chroma-style metadata filter.
+    """
+    collection_name: str
+
+    def add(self, embedding: list, document: str, metadata: dict, doc_id: str = None):
+        self.add_many([embedding], [document], [metadata], [doc_id] if doc_id else None)
+
+    def add_many(self, embeddings: list, documents: list, metadatas: list, ids: list = None):
+        """
+        Upsert documents: an id already stored is overwritten. Ids default to
+        metadata["id"], else the content hash of the text.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _batch(embeddings: list, documents: list, metadatas: list, ids: list = None):
+        """Fill in default ids and keep the last entry of any id repeated within the batch."""
+        if ids is None:
+            ids = [(metadata or {}).get("id") or content_id(document) for document, metadata in zip(documents, metadatas)]
+        rows = {doc_id: (embedding, document, metadata) for doc_id, embedding, document, metadata in zip(ids, embeddings, documents, metadatas)}
+        return (
+            [row[0] for row in rows.values()], [row[1] for row in rows.values()],
+            [row[2] for row in rows.values()], list(rows),
+        )
+
+    def existing_ids(self, ids: list) -> set:
+        raise NotImplementedError
+
+    def search(self, embedding: list, k: int, where: dict = None) -> list:
+        raise NotImplementedError
+
+    def search_many(self, embeddings: list, k: int, where: dict = None) -> list:
+        """search() for several query embeddings; one result list per embedding."""
+        return [self.search(embedding, k, where) for embedding in embeddings]
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def delete(self, ids: list):
+        raise NotImplementedError
+
+    def update_metadatas(self, ids: list, metadatas: list):
+        """Replace stored documents' metadata, keeping their text and embeddings."""
+        raise NotImplementedError
+
+    def iter_metadatas(self, batch_size: int = 1000):
+        """Yield (ids, metadatas) pages covering the whole collection."""
+        raise NotImplementedError
+
+    def iter_documents(self, batch_size: int = 1000):
+        """Yield (ids, documents, metadatas) pages covering the whole collection."""
+        raise NotImplementedError
+
+    def compact(self):
+        """Reclaim space after deletes; a no-op unless the backend needs it."""
+
+def create_vector_store(collection_name: str = POLICY_COLLECTION) -> BaseVectorStore:
+    """
+    Open a collection with the backend selected by VECTOR_BACKEND ("chroma" or "faiss").
+    """
+    if VECTOR_BACKEND == "faiss":
+        # Imported lazily: faiss is only needed when that backend is selected
+        from rag.faiss_store import FaissVectorStore
+        return FaissVectorStore(collection_name)
+    return ChromaVectorStore(collection_name)
+
+class ChromaVectorStore(BaseVectorStore):
+    def __init__(self, collection_name: str = POLICY_COLLECTION):
+        # Imported lazily, like faiss: a FAISS-only deployment does not need chromadb
+        import chromadb
+        self.collection_name = collection_name
         # Use absolute path to app/chroma_db
         chroma_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chroma_db")
         chroma_path = os.path.abspath(chroma_path)
         self.client = chromadb.PersistentClient(path=chroma_path)
         try:
-            self.collection = self.client.get_or_create_collection(name="incidents_and_policies")
+            self.collection = self.client.get_or_create_collection(name=self.collection_name)
         except Exception as e:
             # If there's an issue, try to delete and recreate
             import shutil
@@ -19,32 +97,84 @@ class VectorStore:
                 shutil.rmtree(chroma_path)
             os.makedirs(chroma_path, exist_ok=True)
             self.client = chromadb.PersistentClient(path=chroma_path)
-            self.collection = self.client.get_or_create_collection(name="incidents_and_policies")
-
-    def add(self, embedding: list, document: str, metadata: dict):
-        doc_id = metadata.get("id", str(hash(document)))
-        self.collection.add(
-            embeddings=[embedding],
-            documents=[document],
-            metadatas=[metadata],
-            ids=[doc_id]
+            self.collection = self.client.get_or_create_collection(name=self.collection_name)
+
+    def add_many(self, embeddings: list, documents: list, metadatas: list, ids: list = None):
+        """Bulk variant of add: one collection upsert for many documents."""
+        if not documents:
+            return
+        embeddings, documents, metadatas, ids = self._batch(embeddings, documents, metadatas, ids)
+        self.collection.upsert(
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
         )
 
-    def search(self, embedding: list, k: int):
+    def existing_ids(self, ids: list) -> set:
+        """Subset of the given ids already stored in the collection."""
+        if not ids:
+            return set()
+        return set(self.collection.get(ids=ids, include=[])["ids"])
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def delete(self, ids: list):
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def update_metadatas(self, ids: list, metadatas: list):
+        if ids:
+            self.collection.update(ids=ids, metadatas=metadatas)
+
+    def iter_metadatas(self, batch_size: int = 1000):
+        offset = 0
+        while True:
+            page = self.collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+            if not page["ids"]:
+                return
+            offset += len(page["ids"])
+            yield page["ids"], page["metadatas"]
+
+    def iter_documents(self, batch_size: int = 1000):
+        offset = 0
+        while True:
+            page = self.collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                return
+            offset += len(page["ids"])
+            yield page["ids"], page["documents"], page["metadatas"]
+
+    def search(self, embedding: list, k: int, where: dict = None):
+        return self.search_many([embedding], k, where)[0]
+
+    def search_many(self, embeddings: list, k: int, where: dict = None):
+        """One collection query for several embeddings sharing k and the metadata filter."""
         try:
+            # The metadata filter is applied inside Chroma, before the top-k cut
             results = self.collection.query(
-                query_embeddings=[embedding],
-                n_results=k
+                query_embeddings=embeddings,
+                n_results=k,
+                where=where,
+                include=["documents", "metadatas", "distances"]
             )
             return [
-                {
-                    "text": doc,
-                    "metadata": meta
-                }
-                for doc, meta in zip(results["documents"][0], results["metadatas"][0])
+                [
+                    {
+                        "id": doc_id,
+                        "text": doc,
+                        "metadata": meta,
+                        "distance": distance
+                    }
+                    for doc_id, doc, meta, distance in zip(ids, docs, metas, distances)
+                ]
+                for ids, docs, metas, distances in zip(
+                    results["ids"], results["documents"], results["metadatas"], results["distances"]
+                )
             ]
         except Exception as e:
             # If collection doesn't exist, recreate it
-            self.collection = self.client.get_or_create_collection(name="incidents_and_policies")
+            self.collection = self.client.get_or_create_collection(name=self.collection_name)
             # But since it's empty, return empty results
-            return []
+            return [[] for _ in embeddings]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 class IncidentCreateRequest(BaseModel):
     store_id: str = Field(..., description="Store (location) ID")
@@ -11,7 +11,25 @@ class IncidentCreateRequest(BaseModel):
 
 class IncidentCreateResponse(BaseModel):
     incident_id: str
-    # Optionally expand with more details if needed
+    status: str = Field("queued", description="Processing status: queued, running, awaiting_human, completed or failed")
+
+class IncidentStatusResponse(BaseModel):
+    incident_id: str
+    status: str
+    current_node: Optional[str] = Field(None, description="Graph node currently executing")
+    completed_nodes: List[str] = Field(default_factory=list)
+    error: Optional[str] = None
+
+class IncidentBatchItem(BaseModel):
+    incident_id: str
+    status: str = Field(..., description="awaiting_human, completed or failed")
+    error: Optional[str] = None
+
+class IncidentBatchResponse(BaseModel):
+    total: int
+    stored: int
+    failed: int
+    incidents: List[IncidentBatchItem]
 
 class HumanDecisionRequest(BaseModel):
     decision: str
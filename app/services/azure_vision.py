@@ -7,6 +7,7 @@ import logging
 from azure.ai.vision.imageanalysis import ImageAnalysisClient
 from azure.core.credentials import AzureKeyCredential
 from config.logging_config import get_logger
+from metrics import record_external_call
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -51,6 +52,7 @@ def process_image(image_data: bytes) -> dict:
 
     try:
         # Analyze the image with specified features[citation:9]
+        record_external_call("azure_vision")
         result = client.analyze(
             image_data=image_data,
             visual_features=[
@@ -0,0 +1,43 @@
+"""
+Local store for uploaded incident media.
+
+Every graph checkpoint serializes the whole incident state, so media kept in
+the state would be copied into each of them. The API writes an uploaded video
+here once, keyed by incident id, and the state carries only its reference;
+the video agent reads the file by that reference, and the file is deleted
+once the incident's graph run ends.
+"""
+import os
+import tempfile
+from config.logging_config import get_logger
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = get_logger(__name__)
+
+MEDIA_DIR = os.getenv("MEDIA_DIR", os.path.join(tempfile.gettempdir(), "sentinelstore-media"))
+
+def _path(media_ref: str) -> str:
+    # References are bare file names; never follow a path out of MEDIA_DIR
+    return os.path.join(MEDIA_DIR, os.path.basename(media_ref))
+
+def save_video(incident_id: str, video_bytes: bytes) -> str:
+    """Store an incident's video; returns the reference to keep in the state."""
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    media_ref = f"{incident_id}.mp4"
+    with open(_path(media_ref), "wb") as f:
+        f.write(video_bytes)
+    return media_ref
+
+def video_path(media_ref: str) -> str:
+    """Local file of a stored video, or None when it is no longer stored."""
+    path = _path(media_ref)
+    return path if os.path.exists(path) else None
+
+def delete_media(media_ref: str):
+    try:
+        os.unlink(_path(media_ref))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not delete media '{media_ref}': {e}")
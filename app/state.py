@@ -1,6 +1,17 @@
-from typing import TypedDict, Dict, List, Optional, Any
+import operator
+from typing import Annotated, TypedDict, Dict, List, Optional, Any
+
+
+def merge_dicts(left: Optional[Dict], right: Optional[Dict]) -> Dict:
+    """Reducer that shallow-merges dict updates so parallel branches don't overwrite each other."""
+    merged = dict(left or {})
+    merged.update(right or {})
+    return merged
+
 
 class IncidentState(TypedDict):
+    # Plain JSON-native data only: the state is checkpointed and stored in MongoDB.
+    # Engines (llm, rag_engine) travel in config["configurable"] instead.
     # Identity
     incident_id: str
     store_id: str
@@ -19,7 +30,7 @@ class IncidentState(TypedDict):
 
 
     # Memory
-    episode_memory: List[str]          # short-term
+    episode_memory: Annotated[List[str], operator.add]  # short-term, appended to by each node
     working_memory: Dict[str, Any]     # reasoning context
     long_term_context: Optional[str]   # retrieved history
 
@@ -35,7 +46,7 @@ class IncidentState(TypedDict):
     # Planning & execution
     plan: Optional[List[str]]
     execution_actions: Optional[Dict]
-    execution_results: Dict
+    execution_results: Annotated[Dict, merge_dicts]
 
     # Lifecycle
     resolved: bool
@@ -45,8 +56,14 @@ class IncidentState(TypedDict):
     # Explainability
     explanation: Optional[str]
 
-    # Engines
-    rag_engine: object
-    llm: object
+    # Reflection
     reflection: Optional[str]
     reflection_tags: Optional[List[str]]
+
+    # Latency budget (epoch seconds); degraded once any node fell back for lack of time
+    budget_started_at: Optional[float]
+    deadline_at: Optional[float]
+    degraded: bool
+
+    # Instrumentation: node name -> metrics of its latest execution
+    node_metrics: Annotated[Dict[str, Dict[str, Any]], merge_dicts]
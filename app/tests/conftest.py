@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Modules import each other relative to app/, as when the API runs from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the persistent embedding cache out of the working tree
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "embeddings.sqlite3"))
@@ -0,0 +1,44 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from agents.fusion import fusion_understanding_node
+from agents.learning import learning_node
+from agents.rag_queries import memory_query, self_reflect_query
+
+
+class FusionLLM:
+    async def ainvoke(self, prompt):
+        return SimpleNamespace(content=json.dumps({"incident_type": "theft", "combined_confidence": 0.9}))
+
+
+class RecordingRAG:
+    def __init__(self):
+        self.metadatas = []
+
+    async def aadd_document(self, document, metadata):
+        self.metadatas.append(metadata)
+
+
+def test_memory_lookups_and_learning_use_the_fused_incident_type():
+    rag = RecordingRAG()
+    config = {"configurable": {"llm": FusionLLM(), "rag_engine": rag}}
+    state = {
+        "incident_id": "test", "store_id": "store_1", "incident_type": None, "severity": 4,
+        "fused_incident": None, "plan": [], "episode_memory": [],
+    }
+
+    update = asyncio.run(fusion_understanding_node(state, config))
+    # Fusion only reports its classification; the incident's own field is left alone
+    assert update == {"fused_incident": {"incident_type": "theft", "combined_confidence": 0.9}}
+    state.update(update)
+
+    expected_where = {"$and": [{"store_id": {"$eq": "store_1"}}, {"incident_type": {"$eq": "theft"}}]}
+    for build in (memory_query, self_reflect_query):
+        query = build(state)
+        assert query["where"] == expected_where
+        assert query["scope"] == {"incident_type": "theft", "severity": 4}
+
+    asyncio.run(learning_node(state, config))
+    # Stored under the type the memory lookups above filter on
+    assert rag.metadatas[0]["incident_type"] == "theft"
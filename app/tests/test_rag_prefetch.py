@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import rag.rag_engine as rag_engine
+from rag.rag_engine import RAGEngine
+from agents.planning import response_planning_node
+from agents.monitoring import monitoring_node
+from agents.explainability import explainability_node
+from agents.self_reflection import self_reflection_node
+
+
+class RecordingStore:
+    """Vector store returning one fixed document and recording how it was searched."""
+
+    def __init__(self, text):
+        self.text = text
+        self.searches = []
+
+    def _results(self, k):
+        return [{"id": self.text, "text": self.text, "metadata": {}, "distance": 0.1}][:k]
+
+    def search(self, embedding, k, where=None):
+        self.searches.append("search")
+        return self._results(k)
+
+    def search_many(self, embeddings, k, where=None):
+        self.searches.append(f"search_many x{len(embeddings)}")
+        return [self._results(k) for _ in embeddings]
+
+
+class EchoLLM:
+    async def ainvoke(self, prompt):
+        return SimpleNamespace(content="Reflection: severity_tuning")
+
+
+def test_monitor_escalation_keeps_post_monitor_prefetch_hits(monkeypatch):
+    embedded = []
+
+    async def fake_embed_texts(texts):
+        embedded.extend(texts)
+        return [[1.0, float(len(text))] for text in texts]
+
+    async def fake_embed_text(text):
+        embedded.append(text)
+        return [1.0, float(len(text))]
+
+    monkeypatch.setattr(rag_engine, "aembed_texts", fake_embed_texts)
+    monkeypatch.setattr(rag_engine, "aembed_text", fake_embed_text)
+    policy, memory = RecordingStore("policy clause"), RecordingStore("past incident")
+    config = {"configurable": {"rag_engine": RAGEngine(policy, memory), "llm": EchoLLM()}}
+    state = {
+        "incident_id": "test", "store_id": "store_1", "incident_type": "theft", "severity": 5,
+        "risk_score": 0.9, "confidence": 0.8, "plan": [], "execution_results": {}, "episode_memory": [],
+    }
+
+    async def run():
+        state.update(await response_planning_node(state, config))
+        state.update(await monitoring_node(state))
+        state.update(await explainability_node(state, config))
+        state.update(await self_reflection_node(state, config))
+
+    asyncio.run(run())
+
+    # The monitor escalated before the lookups were built...
+    assert state["severity"] == 6
+    # ...and explain and self-reflect were answered from their one prefetch: the only
+    # other search and embedding are planning's own
+    assert policy.searches == ["search", "search_many x1"]
+    assert memory.searches == ["search_many x1"]
+    assert len(embedded) == 3